@@ -0,0 +1,82 @@
+import threading
+import time
+from collections import deque
+
+import serial
+
+from protocolo import ProtocolParser, RESET, MODE
+from instrumentacion import PERF
+
+
+def drain(dq):
+    # Vacía una deque de un golpe (popleft es atómico, no hace falta lock)
+    out = []
+    pop = out.append
+    take = dq.popleft
+    try:
+        while True:
+            pop(take())
+    except IndexError:
+        pass
+    return out
+
+
+# Hilo dueño del puerto serie: lee en bloque con in_waiting, pasa los bytes
+# por el parser y deja los eventos en self.events. Un evento RESET marca que
+# se vació el buffer de entrada (lo anterior es de la corrida previa). Cuando
+# el sketch anuncia un cambio de modo (evento MODE) el hilo cambia el baud.
+# Con instrumentación, self.stamps lleva (instante, nº de eventos) de cada
+# bloque para medir cuánto esperan los eventos en la cola.
+class SerialReader(threading.Thread):
+    def __init__(self, ser, parser=None):
+        super().__init__(daemon=True)
+        self.ser = ser
+        self.parser = parser or ProtocolParser()
+        self.events = deque()
+        self.stamps = deque()
+        self.error = None
+        self._tx = deque()
+        self._stop_evt = threading.Event()
+
+    def write(self, data, reset_input=False):
+        # el envío lo hace el hilo, así nadie más toca el handle
+        self._tx.append((data, reset_input))
+
+    def stop(self, timeout=1.0):
+        self._stop_evt.set()
+        if self.is_alive():
+            self.join(timeout)
+        try: self.ser.close()
+        except Exception: pass
+
+    def run(self):
+        ser, events, tx, parser = self.ser, self.events, self._tx, self.parser
+        perf, clock = PERF, time.perf_counter
+        if perf:
+            h_read, h_parse = perf.histogram("serie.lectura"), perf.histogram("serie.parseo")
+        try:
+            while not self._stop_evt.is_set():
+                while tx:
+                    data, reset = tx.popleft()
+                    if reset:
+                        ser.reset_input_buffer()
+                        parser.reset()
+                        events.append((RESET, None, None))
+                    ser.write(data)
+                n = ser.in_waiting
+                if perf: t0 = clock()
+                chunk = ser.read(n if n else 1)   # bloquea hasta timeout si no hay nada
+                if chunk:
+                    if perf: t1 = clock()
+                    evs = parser.feed(chunk)
+                    if perf:
+                        t2 = clock()
+                        h_read.add(t1 - t0); h_parse.add(t2 - t1)
+                        perf.count("serie.bytes", len(chunk))
+                        self.stamps.append((t2, len(evs)))
+                    events.extend(evs)
+                    for kind, val, _ in evs:
+                        if kind == MODE:
+                            ser.baudrate = val
+        except (serial.SerialException, OSError) as e:
+            self.error = e
@@ -0,0 +1,171 @@
+import numpy as np
+
+# Columnas por corrida. Las estadísticas (mean/std/worst) se calculan una
+# sola vez al insertar; 'offset' guarda NaN cuando no aplica.
+COLUMNS = ('ref', 'flowAvg', 'voltAvg', 'prec', 'exact', 'offset', 'std', 'worst')
+
+
+# Almacén columnar de experimentos: todas las muestras en un único buffer
+# contiguo + índice (start, length) por corrida, y una columna NumPy por
+# estadística. Borrar deja una lápida: la fila sale del índice de filas vivas
+# (un memmove de 8 bytes por corrida, sin tocar muestras ni columnas) y
+# cuando las corridas o las muestras muertas superan a las vivas se compacta.
+# Sin lápidas las filas físicas son las lógicas y el índice no se usa.
+class ExperimentStore:
+    def __init__(self, run_capacity=64, sample_capacity=8192):
+        self._samples = np.empty(sample_capacity)
+        self._n_samples = 0
+        self._start = np.empty(run_capacity, dtype=np.int64)
+        self._length = np.empty(run_capacity, dtype=np.int64)
+        self._cols = {c: np.empty(run_capacity) for c in COLUMNS}
+        self._n_runs = 0
+        self._dead_runs = 0
+        self._dead_samples = 0
+        self._live = np.empty(run_capacity, dtype=np.int64)   # filas vivas, si hay lápidas
+
+    # ── Lectura ──────────────────────────────────────────────────────────
+    def __len__(self):
+        return self._n_runs - self._dead_runs
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, i):
+        row = self._row(i)
+        rec = {c: float(self._cols[c][row]) for c in COLUMNS}
+        if np.isnan(rec['offset']):
+            rec['offset'] = None
+        rec['meas'] = self._slice(row)
+        return rec
+
+    def column(self, name):
+        col = self._cols[name][:self._n_runs]
+        return col[self._live_rows()] if self._dead_runs else col
+
+    def samples(self, i):
+        return self._slice(self._row(i))
+
+    def lengths(self):
+        l = self._length[:self._n_runs]
+        return l[self._live_rows()] if self._dead_runs else l
+
+    def packed(self):
+        # muestras vivas contiguas (vista si no hay lápidas) + longitudes
+        lengths = self.lengths()
+        if not self._dead_runs:
+            return self._samples[:self._n_samples], lengths
+        if not len(lengths):
+            return np.empty(0), lengths
+        return np.concatenate([self._slice(r) for r in self._live_rows()]), lengths
+
+    # ── Escritura ────────────────────────────────────────────────────────
+    def append(self, ref, flowAvg, prec, exact, meas, offset=None):
+        meas = np.asarray(meas, dtype=np.float64)
+        n = len(meas)
+        self._reserve(self._n_runs+1, self._n_samples+n)
+        row, s0 = self._n_runs, self._n_samples
+        self._samples[s0:s0+n] = meas
+        self._start[row], self._length[row] = s0, n
+        if self._dead_runs:
+            self._live[len(self)] = row
+        mu = meas.mean()
+        c = self._cols
+        c['ref'][row] = ref
+        c['flowAvg'][row] = flowAvg
+        c['voltAvg'][row] = mu
+        c['prec'][row] = prec
+        c['exact'][row] = exact
+        c['offset'][row] = np.nan if offset is None else offset
+        c['std'][row] = meas.std()
+        c['worst'][row] = np.max(np.abs(meas-mu))/mu*100
+        self._n_runs += 1
+        self._n_samples += n
+        return len(self)-1
+
+    def extend(self, cols, lengths, samples):
+        # alta en bloque con estadísticas ya calculadas (p. ej. al cargar una
+        # sesión): una sola copia de las muestras y de cada columna
+        lengths = np.asarray(lengths, dtype=np.int64)
+        k, n = len(lengths), int(lengths.sum())
+        if len(samples) != n:
+            raise ValueError(f"{len(samples)} muestras para longitudes que suman {n}")
+        self._reserve(self._n_runs+k, self._n_samples+n)
+        r0, s0 = self._n_runs, self._n_samples
+        self._samples[s0:s0+n] = samples
+        self._start[r0:r0+k] = s0 + np.cumsum(lengths) - lengths
+        self._length[r0:r0+k] = lengths
+        if self._dead_runs:
+            m = len(self)
+            self._live[m:m+k] = np.arange(r0, r0+k)
+        for c in COLUMNS:
+            self._cols[c][r0:r0+k] = cols[c]
+        self._n_runs += k
+        self._n_samples += n
+        return range(len(self)-k, len(self))
+
+    def delete(self, i):
+        n = len(self)
+        if i < 0: i += n
+        row = self._row(i)
+        live = self._live
+        if not self._dead_runs:
+            # primera lápida desde la última compactación: se arma el índice
+            live[:n] = np.arange(n)
+        live[i:n-1] = live[i+1:n]
+        self._dead_runs += 1
+        self._dead_samples += int(self._length[row])
+        if (self._dead_runs > len(self)
+                or self._dead_samples > self._n_samples-self._dead_samples):
+            self.compact()
+
+    def clear(self):
+        self._n_runs = self._n_samples = self._dead_runs = self._dead_samples = 0
+
+    def compact(self):
+        if not self._dead_runs:
+            return
+        live = self._live_rows().copy()
+        lengths = self._length[live]
+        new = np.empty(max(len(self._samples)//2, int(lengths.sum()), 1))
+        pos = 0
+        for row, n in zip(live, lengths):
+            s0 = self._start[row]
+            new[pos:pos+n] = self._samples[s0:s0+n]
+            pos += n
+        k = len(live)
+        for c in COLUMNS:
+            self._cols[c][:k] = self._cols[c][live]
+        self._length[:k] = lengths
+        self._start[:k] = np.concatenate([[0], np.cumsum(lengths)[:-1]]) if k else []
+        self._samples = new
+        self._n_runs, self._n_samples, self._dead_runs, self._dead_samples = k, pos, 0, 0
+
+    # ── Internos ─────────────────────────────────────────────────────────
+    def _row(self, i):
+        n = len(self)
+        if i < 0: i += n
+        if not 0 <= i < n:
+            raise IndexError(i)
+        return int(self._live[i]) if self._dead_runs else i
+
+    def _live_rows(self):
+        return self._live[:len(self)]
+
+    def _slice(self, row):
+        s0 = self._start[row]
+        return self._samples[s0:s0+self._length[row]]
+
+    def _reserve(self, runs, samples):
+        if samples > len(self._samples):
+            new = np.empty(max(samples, 2*len(self._samples)))
+            new[:self._n_samples] = self._samples[:self._n_samples]
+            self._samples = new
+        cap = len(self._start)
+        if runs > cap:
+            cap = max(runs, 2*cap)
+            self._start = np.resize(self._start, cap)
+            self._length = np.resize(self._length, cap)
+            self._live = np.resize(self._live, cap)
+            for c in COLUMNS:
+                self._cols[c] = np.resize(self._cols[c], cap)
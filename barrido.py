@@ -0,0 +1,103 @@
+import time
+from collections import deque
+
+
+def parse_points(text):
+    # "0, 2, 4:10:2" → [0, 2, 4, 6, 8, 10]; a:b:paso incluye b
+    points = []
+    for tok in text.replace(";", ",").split(","):
+        tok = tok.strip()
+        if not tok:
+            continue
+        parts = [float(p) for p in tok.split(":")]
+        if len(parts) == 1:
+            points.append(parts[0])
+        elif len(parts) == 3 and parts[2] > 0:
+            a, b, step = parts
+            k = int(round((b - a)/step))
+            points.extend(a + i*step for i in range(k + 1) if a + i*step <= b + 1e-9*step)
+        else:
+            raise ValueError(f"Rango inválido: {tok!r} (usar inicio:fin:paso)")
+    return points
+
+
+# Cola de puntos de un barrido de calibración: el offset (ref = 0) va
+# primero y luego cada referencia con sus repeticiones. No toca el puerto ni
+# Tk: la app pide next_point(), avisa point_done() o retry(equipo) y
+# consulta eta(). Los reintentos se cuentan por equipo y por punto.
+class SweepScheduler:
+    def __init__(self, refs, repeats=1, retries=2, settle=0.0, with_offset=True):
+        refs = [r for r in refs if r != 0]
+        pts = [0.0] if with_offset else []
+        pts += [r for r in refs for _ in range(max(repeats, 1))]
+        self.queue = deque(pts)
+        self.total = len(pts)
+        self.retries = retries
+        self.settle = settle
+        self.current = None
+        self.attempts = {}      # equipo → reintentos en el punto actual
+        self.failed = []        # (ref, [equipos]) una vez por punto
+        self._miss = None       # entrada de failed del punto actual
+        self.stopped = False
+        self._t0 = None
+        self._durations = []
+
+    def next_point(self):
+        # siguiente referencia, o None si se terminó la cola
+        if not self.queue:
+            self.current = None
+            return None
+        self.current = self.queue.popleft()
+        self.attempts = {}
+        self._miss = None
+        return self.current
+
+    def started(self, now=None):
+        # se mandó la referencia al sketch (después del asentamiento); un
+        # reintento no reinicia la cuenta: el punto dura desde el primer envío
+        if self._t0 is None:
+            self._t0 = time.time() if now is None else now
+
+    def point_done(self, now=None):
+        now = time.time() if now is None else now
+        if self._t0 is not None:
+            self._durations.append(now - self._t0)
+        self._t0 = None
+
+    def retry(self, dev):
+        # corrida perdida (timeout) en dev: True si hay que repetirle
+        # self.current; detenido el barrido no se repite nada
+        if self.stopped:
+            return False
+        n = self.attempts.get(dev, 0)
+        if n < self.retries:
+            self.attempts[dev] = n + 1
+            return True
+        if self._miss is None:
+            self._miss = (self.current, [])
+            self.failed.append(self._miss)
+        self._miss[1].append(dev)
+        return False
+
+    def stop(self):
+        self.queue.clear()
+        self.stopped = True
+
+    @property
+    def index(self):
+        # número de punto en curso, desde 1
+        return self.total - len(self.queue)
+
+    def eta(self, now=None):
+        # segundos hasta terminar según la duración media medida por punto
+        if not self._durations:
+            return None
+        per_point = sum(self._durations)/len(self._durations) + self.settle
+        left = len(self.queue)*per_point
+        if self.current is not None:
+            if self._t0 is None:   # todavía asentando
+                left += per_point
+            else:
+                elapsed = (time.time() if now is None else now) - self._t0
+                left += max(per_point - self.settle - elapsed, 0.0)
+        return left
@@ -0,0 +1,138 @@
+# Arranque en frío de la app. Tres cosas, cada una en procesos nuevos:
+#   1. desglose de `python -X importtime -c "import medicion"` (primera etapa)
+#      y de lo que carga después _late_init (segunda etapa);
+#   2. que la primera etapa no traiga numpy, matplotlib, reportlab ni
+#      pyserial (si vuelve alguno a nivel de módulo, falla);
+#   3. con display: tiempo desde que arranca el proceso hasta el primer
+#      cuadro de la ventana y hasta que las gráficas quedan listas.
+# Sale con 1 si se rompe el punto 2 o se pasa de los presupuestos.
+#
+#   python benchmarks/bench_arranque.py [--reps 5] [--max-import-ms 150] [--max-frame-ms 500]
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+HEAVY = ('numpy', 'matplotlib', 'reportlab', 'serial')
+SECOND_STAGE = "matplotlib.backends.backend_tkagg, matplotlib.figure, calibracion, graficas, sesion"
+TOP = 8
+
+MODULES = r"""
+import json, sys
+sys.path.insert(0, {root!r})
+import medicion
+print(json.dumps(sorted({{m.split('.')[0] for m in sys.modules}})))
+"""
+
+FRAME = r"""
+import json, sys, time
+sys.path.insert(0, {root!r})
+import tkinter as tk
+out = {{}}
+try:
+    import medicion
+    root = tk.Tk()
+except Exception as e:   # sin display
+    print(json.dumps({{'error': str(e)}})); sys.exit()
+app = medicion.FlowCalibrationApp(root)
+late = app._late_init
+def probe():
+    # _late_init corre recién después del primer pintado
+    out['frame'] = time.time()
+    late()
+    root.update()
+    out['plots'] = time.time()
+    root.destroy()
+app._late_init = probe
+root.mainloop()
+print(json.dumps(out))
+"""
+
+
+def run(args, code=None):
+    cmd = [sys.executable] + args + ([] if code is None else ["-c", code])
+    return subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True, check=True)
+
+
+def importtime(stmt):
+    # {módulo: (propio, acumulado)} en µs, y los importados directamente
+    err = run(["-X", "importtime", "-c", stmt]).stderr
+    times, direct = {}, []
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        head, cum, name = line.split("|")
+        own = int(head.split(":")[1])
+        stripped = name.lstrip()
+        depth = (len(name) - len(stripped) - 1)//2
+        times[stripped] = (own, int(cum))
+        if depth == 1:
+            direct.append(stripped)
+    return times, direct
+
+
+def breakdown(title, times, names, total):
+    print(f"{title}: {total/1e3:.1f} ms")
+    for name in sorted(names, key=lambda n: -times[n][1])[:TOP]:
+        print(f"  {name:<40} {times[name][1]/1e3:8.1f} ms")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--reps", type=int, default=5)
+    ap.add_argument("--max-import-ms", type=float, default=150.0, help="import medicion (mediana)")
+    ap.add_argument("--max-frame-ms", type=float, default=500.0, help="hasta el primer cuadro (mediana)")
+    args = ap.parse_args(argv)
+    ok = True
+
+    # 1. desglose (la primera corrida calienta la caché de disco)
+    importtime("import medicion")
+    first = [importtime("import medicion") for _ in range(args.reps)]
+    stage1 = statistics.median(t["medicion"][1] for t, _ in first)
+    times, _ = first[-1]
+    breakdown("import medicion", times, [n for n in times if n != "medicion"
+                                         and times[n][1] >= 0.02*stage1
+                                         and n.split(".")[0] not in ("encodings", "site")], stage1)
+    times, direct = importtime(f"import medicion, {SECOND_STAGE}")
+    late = [n for n in direct if n != "medicion" and n not in first[-1][0]]
+    breakdown("segunda etapa (_late_init)", times, late, sum(times[n][1] for n in late))
+    if stage1/1e3 > args.max_import_ms:
+        print(f"  import medicion supera {args.max_import_ms:.0f} ms")
+        ok = False
+
+    # 2. nada pesado en la primera etapa
+    loaded = json.loads(run([], MODULES.format(root=str(ROOT))).stdout)
+    heavy = [m for m in HEAVY if m in loaded]
+    print("primera etapa sin " + ", ".join(HEAVY) if not heavy
+          else "primera etapa importa: " + ", ".join(heavy))
+    ok = ok and not heavy
+
+    # 3. primer cuadro y gráficas listas, desde el arranque del proceso
+    frames, plots = [], []
+    for _ in range(args.reps):
+        t0 = time.time()
+        res = json.loads(run([], FRAME.format(root=str(ROOT))).stdout)
+        if 'error' in res:
+            print(f"sin display, no se mide el primer cuadro ({res['error']})")
+            break
+        frames.append((res['frame']-t0)*1e3)
+        plots.append((res['plots']-t0)*1e3)
+    if frames:
+        frame = statistics.median(frames)
+        print(f"primer cuadro:   {frame:7.1f} ms   (mediana de {len(frames)})")
+        print(f"gráficas listas: {statistics.median(plots):7.1f} ms")
+        if frame > args.max_frame_ms:
+            print(f"  primer cuadro supera {args.max_frame_ms:.0f} ms")
+            ok = False
+
+    print("OK" if ok else "REGRESIÓN")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+# Prueba de punta a punta contra el emulador del sketch sobre un pty:
+# SerialReader + ProtocolParser reciben corridas de N muestras con distintos
+# retardos entre muestras. Mide latencia del lado host (muestra escrita por
+# el emulador → evento drenado) y la tasa máxima sin perder muestras.
+#
+#   python benchmarks/bench_e2e.py [--muestras 2000] [--baud 115200] [--poll-ms 5] [--binario]
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import serial
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from adquisicion import SerialReader, drain  # noqa: E402
+from emulador import PtyEmulator  # noqa: E402
+from protocolo import END, MODE, SAMPLE, SAMPLES  # noqa: E402
+
+DELAYS = [0.01, 0.001, 0.0002, 0.0]
+TIMEOUT = 120.0
+
+
+def wait_for(reader, kind, timeout=5.0):
+    t0 = time.perf_counter()
+    while time.perf_counter()-t0 < timeout:
+        if any(ev[0] == kind for ev in drain(reader.events)):
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def run_once(emu, reader, n, poll_s):
+    drain(reader.events)
+    arrivals = []
+    t0 = time.perf_counter()
+    reader.write(b"50\n", reset_input=True)
+    got_end = False
+    while not got_end and time.perf_counter()-t0 < TIMEOUT:
+        time.sleep(poll_s)
+        now = time.perf_counter()
+        for kind, val, _ in drain(reader.events):
+            if kind == SAMPLE:
+                arrivals.append(now)
+            elif kind == SAMPLES:
+                arrivals.extend([now]*len(val))
+            elif kind == END:
+                got_end = True
+    wall = time.perf_counter() - t0
+    sent = np.array(emu.firmware.sample_times)
+    got = np.array(arrivals)
+    k = min(len(sent), len(got))
+    lat = (got[:k] - sent[:k])*1e3
+    return wall, len(got), lat
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--muestras", type=int, default=2000)
+    ap.add_argument("--baud", type=int, default=None, help="simular la velocidad del enlace")
+    ap.add_argument("--poll-ms", type=float, default=5.0, help="periodo de drenado (la app usa 50)")
+    ap.add_argument("--binario", action="store_true", help="tramas binarias en vez de texto")
+    args = ap.parse_args(argv)
+
+    print(f"{'retardo':>8} {'recibidas':>10} {'perdidas':>9} {'muestras/s':>11} "
+          f"{'lat p50':>8} {'lat p99':>8}  (ms)")
+    best = 0.0
+    for delay in DELAYS:
+        emu = PtyEmulator(n_samples=args.muestras, sample_delay=delay, baud=args.baud, seed=0)
+        emu.start()
+        ser = serial.Serial(emu.port, baudrate=9600 if args.baud else 115200, timeout=0.1)
+        reader = SerialReader(ser); reader.start()
+        if args.binario:
+            reader.write(f"b{args.baud or 115200}\n".encode())
+            wait_for(reader, MODE)
+        elif args.baud:
+            emu.firmware.baud = args.baud
+        try:
+            wall, got, lat = run_once(emu, reader, args.muestras, args.poll_ms/1e3)
+        finally:
+            reader.stop(); emu.stop()
+        lost = args.muestras - got
+        rate = got/wall
+        if not lost:
+            best = max(best, rate)
+        p50, p99 = (np.percentile(lat, [50, 99]) if len(lat) else (np.nan, np.nan))
+        print(f"{delay*1e3:>8.2f} {got:>10} {lost:>9} {rate:>11,.0f} {p50:>8.2f} {p99:>8.2f}")
+    print(f"tasa máxima sostenida sin pérdidas: {best:,.0f} muestras/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+# Benchmark de redibujado: compara reconstruir las tres gráficas desde cero
+# (clear() + draw(), como hacía update_plots antes) contra CalibrationPlots
+# con artistas persistentes, para 10/100/1000 experimentos. Con --lod mide
+# la interacción con sesiones largas y corridas de muchas muestras (nivel de
+# detalle): la selección (camino completo del click) y la traza en vivo en
+# promedio tienen que quedar por debajo de 50 ms en todos los casos. update
+# y los redibujos completos de la traza (al entrar en modo vivo o cambiar
+# los límites, se cuentan por corrida) se informan aparte.
+#
+#   python benchmarks/bench_graficas.py [n1 n2 ...]
+#   python benchmarks/bench_graficas.py --lod
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from graficas import CalibrationPlots  # noqa: E402
+from almacen import ExperimentStore  # noqa: E402
+
+REPS = 5
+LOD_CASES = [(1000, 100), (10000, 100), (50000, 100), (10, 20000), (10, 100000)]
+LOD_BUDGET_MS = 50.0
+
+
+def synthetic_experiments(n, seed=0):
+    rng = np.random.default_rng(seed)
+    exps = []
+    for ref in np.linspace(5, 100, n):
+        meas = rng.normal(0.5 + ref*0.04, 0.02, 100)
+        exps.append({'ref': ref, 'flowAvg': ref, 'voltAvg': float(meas.mean()),
+                     'prec': float(meas.std(ddof=1)), 'exact': 0.0,
+                     'offset': None, 'meas': meas})
+    return exps
+
+
+def legacy_redraw(fig, canvas, axes, experiments, offset, selected):
+    ax_scatter, ax_dev, ax_bar = axes
+    ax_scatter.clear()
+    refs = np.array([e['ref'] for e in experiments])
+    volts = np.array([e['voltAvg'] for e in experiments])
+    if offset is not None:
+        refs = np.append(refs, 0.0); volts = np.append(volts, offset)
+    cols = ['r' if i in selected else 'C0' for i in range(len(refs))]
+    sz = [100 if i in selected else 60 for i in range(len(refs))]
+    ax_scatter.scatter(refs, volts, c=cols, s=sz, picker=5, edgecolor='k', zorder=3, label="Mediciones")
+    m, b = np.polyfit(refs, volts, 1)
+    r2 = np.corrcoef(refs, volts)[0, 1]**2
+    xs = np.linspace(refs.min(), refs.max(), 100)
+    ax_scatter.plot(xs, m*xs+b, label=f"y={m:.3f}x+{b:.3f}, R²={r2:.3f}", zorder=2)
+    ax_scatter.legend()
+    ax_dev.clear()
+    data = np.array(experiments[selected[0]]['meas'])
+    mu, dev, std = data.mean(), data-data.mean(), data.std()
+    lim = max(4*std, abs(dev).max())
+    x = np.linspace(-lim, lim, 300)
+    ax_dev.plot(x, np.exp(-0.5*(x/std)**2), color='C0', zorder=2)
+    ax_dev.scatter(dev, np.exp(-0.5*(dev/std)**2), color='C0', s=30, alpha=0.6, zorder=3)
+    ax_bar.clear()
+    worst = []
+    for e in experiments:
+        arr = np.array(e['meas']); mu = arr.mean()
+        worst.append(float(np.max(np.abs(arr-mu))/mu*100))
+    xs = np.arange(1, len(worst)+1)
+    ax_bar.bar(xs, worst, color=['r' if i in selected else 'C0' for i in range(len(xs))], edgecolor='k', zorder=3)
+    ax_bar.set_xticks(xs)
+    canvas.draw()
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    for _ in range(REPS):
+        fn()
+    return (time.perf_counter()-t0)/REPS*1e3
+
+
+def bench(n):
+    exps = synthetic_experiments(n)
+
+    fig = Figure(figsize=(6, 9)); canvas = FigureCanvasAgg(fig)
+    axes = fig.subplots(3, 1)
+    sel = [0]
+    legacy_update = timed(lambda: legacy_redraw(fig, canvas, axes, exps, 0.5, [n-1]))
+    legacy_pick = timed(lambda: legacy_redraw(fig, canvas, axes, exps, 0.5, [sel.__setitem__(0, (sel[0]+1) % n) or sel[0]]))
+
+    fig = Figure(figsize=(6, 9)); canvas = FigureCanvasAgg(fig)
+    plots = CalibrationPlots(fig, canvas)
+    store = ExperimentStore()
+    for e in exps:
+        store.append(e['ref'], e['flowAvg'], e['prec'], e['exact'], e['meas'])
+    exps = store
+    fit = tuple(np.polyfit(store.column('ref'), store.column('voltAvg'), 1)) + (1.0,)
+    plots.update(exps, 0.5, [n-1], fit)
+    new_update = timed(lambda: plots.update(exps, 0.5, [n-1], fit))
+    # selección: el blit es lo que ve el usuario; el draw_idle llega después
+    canvas.draw_idle = lambda: None
+    new_blit = timed(lambda: plots.select(exps, [sel.__setitem__(0, (sel[0]+1) % n) or sel[0]]))
+    del canvas.draw_idle
+    new_pick = timed(lambda: plots.select(exps, [sel.__setitem__(0, (sel[0]+1) % n) or sel[0]]))
+    return legacy_update, new_update, legacy_pick, new_blit, new_pick
+
+
+def bench_lod(n_exp, n_samples, seed=0):
+    rng = np.random.default_rng(seed)
+    store = ExperimentStore()
+    refs = np.linspace(5, 100, n_exp)
+    meas = rng.normal(0.5 + refs[:, None]*0.04, 0.02, (n_exp, n_samples))
+    for ref, m in zip(refs, meas):
+        store.append(ref, ref, float(m.std(ddof=1)), 0.0, m)
+    fit = tuple(np.polyfit(refs, store.column('voltAvg'), 1)) + (1.0,)
+
+    fig = Figure(figsize=(6, 9)); canvas = FigureCanvasAgg(fig)
+    plots = CalibrationPlots(fig, canvas)
+    full = [0]
+    draw = canvas.draw
+    def counted_draw():
+        full[0] += 1
+        draw()
+    canvas.draw_idle = counted_draw   # Agg: el draw_idle dibuja en el momento
+    sel = [0]
+    def pick():
+        sel[0] = (sel[0] + 7919) % n_exp
+        return [sel[0]]
+    plots.update(store, 0.5, [0], fit)
+    upd = timed(lambda: plots.update(store, 0.5, pick(), fit))
+    # click en un punto, camino completo (con el draw_idle si lo pide)
+    sel_ms = timed(lambda: plots.select(store, pick()))
+
+    # dos corridas llegando en ~100 tandas cada una; se mide la segunda
+    # (la primera fija los límites, como en la app)
+    live_vals = meas[-1]
+    step = max(1, n_samples//100)
+    for run in range(2):
+        plots.update(store, 0.5, [0], fit)
+        full[0] = 0
+        times = []
+        for k in range(step, n_samples+1, step):
+            v = live_vals[:k]
+            t0 = time.perf_counter()
+            plots.live(v, v.mean(), v.std(), v.std()/np.sqrt(k))
+            times.append((time.perf_counter()-t0)*1e3)
+    return upd, sel_ms, float(np.mean(times)), max(times), full[0]
+
+
+def main():
+    if "--lod" in sys.argv[1:]:
+        print(f"{'experimentos':>12} {'muestras':>9} {'update':>8} {'selección':>10} "
+              f"{'vivo':>7} {'vivo máx':>9} {'redibujos':>10}  (ms)")
+        worst = worst_full = 0.0
+        for n_exp, n_samples in LOD_CASES:
+            upd, sel_ms, live, live_max, n_full = bench_lod(n_exp, n_samples)
+            worst = max(worst, sel_ms, live)
+            if n_full:
+                worst_full = max(worst_full, live_max)
+            print(f"{n_exp:>12} {n_samples:>9} {upd:>8.1f} {sel_ms:>10.1f} "
+                  f"{live:>7.1f} {live_max:>9.1f} {n_full:>10}")
+        ok = worst < LOD_BUDGET_MS
+        print(f"peor interacción (selección / traza en vivo promedio): "
+              f"{worst:.1f} ms ({'OK' if ok else 'supera'} {LOD_BUDGET_MS:.0f} ms)")
+        if worst_full:
+            # al entrar en modo vivo o cambiar los límites se dibuja todo
+            print(f"los redibujos completos de la traza llegan a {worst_full:.1f} ms"
+                  f"{' y superan el presupuesto' if worst_full >= LOD_BUDGET_MS else ''}")
+        return 0 if ok else 1
+    sizes = [int(a) for a in sys.argv[1:]] or [10, 100, 1000]
+    print(f"{'N':>6} {'update ant.':>12} {'update':>9} {'pick ant.':>10} {'pick blit':>10} {'pick+idle':>10}  (ms)")
+    for n in sizes:
+        lu, nu, lp, nb, npk = bench(n)
+        print(f"{n:>6} {lu:>12.1f} {nu:>9.1f} {lp:>10.1f} {nb:>10.1f} {npk:>10.1f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+# Costo de la instrumentación: ns por Histogram.add y por llamada envuelta
+# con timed(), y el mismo lazo de parseo + Device.feed con FCAL_PERF
+# apagado y prendido (cada caso en su propio proceso, porque PERF se decide
+# al importar). Con --json deja el reporte del caso prendido.
+#
+#   python benchmarks/bench_instrumentacion.py [--lineas 200000] [--json perf.json]
+import argparse
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+CHILD = r"""
+import sys, time
+sys.path.insert(0, {root!r}); sys.path.insert(0, {bench!r})
+from bench_protocolo import synthetic_session
+from dispositivo import Device
+from instrumentacion import PERF, timed
+from protocolo import ProtocolParser, RESET
+
+class FakeSer:
+    port = "sintetico"
+
+def f(x):
+    return x
+assert (timed("x")(f) is f) == (PERF is None)
+
+data, _ = synthetic_session({n})
+dev = Device(FakeSer())
+parser = ProtocolParser()
+t0 = time.perf_counter()
+for i in range(0, len(data), 4096):
+    evs = parser.feed(data[i:i+4096])
+    if dev.run is None:
+        dev.start_run(50.0, time.time())
+        evs.insert(0, (RESET, None, None))
+    if PERF: PERF.histogram("cola.eventos", lo=1, unit='').add(len(evs))
+    dev.feed(evs)
+dt = time.perf_counter() - t0
+if PERF and {json!r}:
+    PERF.to_json({json!r})
+print(dt)
+"""
+
+
+def child(n, on, json_path=None):
+    env = dict(os.environ, FCAL_PERF="1" if on else "0")
+    code = CHILD.format(root=str(ROOT), bench=str(ROOT/"benchmarks"), n=n, json=json_path or "")
+    out = subprocess.run([sys.executable, "-c", code], env=env, check=True,
+                         capture_output=True, text=True).stdout
+    return float(out.split()[-1])
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--lineas", type=int, default=200_000)
+    ap.add_argument("--json", default=None, help="guardar el reporte del caso instrumentado")
+    args = ap.parse_args(argv)
+
+    from instrumentacion import Histogram, Instruments
+    h = Histogram()
+    n = 1_000_000
+    t0 = time.perf_counter()
+    for i in range(n):
+        h.add(1e-4)
+    print(f"Histogram.add:      {(time.perf_counter()-t0)/n*1e9:7.0f} ns")
+
+    perf = Instruments()
+    add = perf.histogram("x").add
+    clock = time.perf_counter
+    t0 = time.perf_counter()
+    for i in range(n):
+        t = clock(); add(clock() - t)
+    print(f"medición de etapa:  {(time.perf_counter()-t0)/n*1e9:7.0f} ns")
+
+    off = min(child(args.lineas, False) for _ in range(3))
+    on = min(child(args.lineas, True, args.json) for _ in range(3))
+    print(f"parseo + feed, {args.lineas} líneas: apagado {off:.3f} s, "
+          f"prendido {on:.3f} s ({(on/off-1)*100:+.1f} %)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
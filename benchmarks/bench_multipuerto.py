@@ -0,0 +1,81 @@
+# Varios equipos a la vez contra emuladores del sketch sobre ptys, con
+# velocidades distintas: la misma referencia a todos (como la app) contra
+# un equipo detrás de otro. En paralelo el punto dura lo que el más lento.
+#
+#   python benchmarks/bench_multipuerto.py [--equipos 4] [--puntos 5] [--muestras 50]
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import serial
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from dispositivo import Device  # noqa: E402
+from emulador import PtyEmulator  # noqa: E402
+
+TIMEOUT = 60.0
+
+
+def run_point(devices, ref):
+    now = time.time()   # reloj de Device.run['t0']
+    for d in devices:
+        d.start_run(ref, now)
+    pending = set(devices)
+    while pending:
+        time.sleep(0.005)
+        if time.time()-now > TIMEOUT:
+            raise TimeoutError(", ".join(d.name for d in pending))
+        for d in list(pending):
+            done, _ = d.feed(d.drain_events())
+            if done is not None:
+                d.session.add_run(done)
+                pending.discard(d)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--equipos", type=int, default=4)
+    ap.add_argument("--puntos", type=int, default=5, help="referencias además del offset")
+    ap.add_argument("--muestras", type=int, default=50)
+    ap.add_argument("--retardo", type=float, default=0.005, help="s entre muestras del equipo más rápido")
+    args = ap.parse_args(argv)
+
+    # cada equipo un poco más lento que el anterior
+    delays = [args.retardo*(1 + 0.5*i) for i in range(args.equipos)]
+    emus = [PtyEmulator(n_samples=args.muestras, sample_delay=dl, seed=i) for i, dl in enumerate(delays)]
+    for e in emus:
+        e.start()
+    devices = [Device(serial.Serial(e.port, baudrate=115200, timeout=0.1)).start() for e in emus]
+    refs = [0.0] + [10.0*(i+1) for i in range(args.puntos)]
+    try:
+        time.sleep(0.2)
+        t0 = time.perf_counter()
+        for ref in refs:
+            run_point(devices, ref)
+        par = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        for d in devices:
+            for ref in refs:
+                run_point([d], ref)
+        seq = time.perf_counter() - t0
+    finally:
+        for d in devices:
+            d.stop()
+        for e in emus:
+            e.stop()
+
+    slowest = len(refs)*args.muestras*max(delays)
+    total = len(refs)*args.muestras*sum(delays)
+    print(f"{args.equipos} equipos, {len(refs)} puntos, {args.muestras} muestras/corrida")
+    print(f"  en paralelo:   {par:6.2f} s   (muestreo del más lento: {slowest:.2f} s)")
+    print(f"  uno por uno:   {seq:6.2f} s   (suma del muestreo:      {total:.2f} s)")
+    print(f"  aceleración:   {seq/par:6.2f}x")
+    ok = all(len(d.session.experiments) == 2*args.puntos for d in devices)
+    print("  corridas completas" if ok else "  FALTAN CORRIDAS")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
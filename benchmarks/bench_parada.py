@@ -0,0 +1,80 @@
+# Parada anticipada contra el emulador del sketch sobre un pty: misma regla
+# que la app (RunningStats.settled) con distintas tolerancias de σ de la
+# media. Compara tiempo por punto y error de la media contra la corrida
+# completa de N_MUESTRAS.
+#
+#   python benchmarks/bench_parada.py [--retardo 0.01] [--ruido 0.01] [--corridas 5]
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import serial
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from adquisicion import SerialReader, drain  # noqa: E402
+from calibracion import RunningStats  # noqa: E402
+from emulador import MIN_MUESTRAS, N_MUESTRAS, PtyEmulator, flow_to_volt  # noqa: E402
+from protocolo import END, SAMPLE, SAMPLES  # noqa: E402
+
+REF = 50.0
+TOLS = [None, 0.002, 0.001, 0.0005]
+POLL_S = 0.05   # mismo periodo que FlowCalibrationApp.POLL_MS
+TIMEOUT = 60.0
+
+
+def run_once(reader, tol):
+    drain(reader.events)
+    st = RunningStats()
+    stop_sent = False
+    t0 = time.perf_counter()
+    reader.write(f"{REF}\n".encode(), reset_input=True)
+    while time.perf_counter()-t0 < TIMEOUT:
+        time.sleep(POLL_S)
+        for kind, val, _ in drain(reader.events):
+            if kind == SAMPLE:
+                st.add(val)
+            elif kind == SAMPLES:
+                st.add_many(val)
+            elif kind == END:
+                return time.perf_counter()-t0, len(val), float(val.mean())
+        if tol is not None and not stop_sent and st.settled(tol, MIN_MUESTRAS):
+            reader.write(b"s\n")
+            stop_sent = True
+    raise TimeoutError("no llegó el resumen")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--retardo", type=float, default=0.01, help="s entre muestras (el sketch usa 0.1)")
+    ap.add_argument("--ruido", type=float, default=0.01, help="σ del ruido en V")
+    ap.add_argument("--corridas", type=int, default=5, help="corridas por tolerancia")
+    args = ap.parse_args(argv)
+
+    emu = PtyEmulator(sample_delay=args.retardo, noise_sigma=args.ruido, seed=0)
+    emu.start()
+    ser = serial.Serial(emu.port, baudrate=115200, timeout=0.1)
+    reader = SerialReader(ser); reader.start()
+    # el emulador redondea a cuentas de ADC como el sketch
+    true_v = round(flow_to_volt(REF)*1023/5.0)*5.0/1023
+    try:
+        print(f"N_MUESTRAS = {N_MUESTRAS}, retardo = {args.retardo*1e3:g} ms, ruido σ = {args.ruido} V")
+        print(f"{'tol σ media':>12} {'muestras':>9} {'s/punto':>8} {'ahorro':>7} {'|err| media (mV)':>17}")
+        full = None
+        for tol in TOLS:
+            res = [run_once(reader, tol) for _ in range(args.corridas)]
+            wall = np.mean([r[0] for r in res])
+            n = np.mean([r[1] for r in res])
+            err = np.mean([abs(r[2]-true_v) for r in res])*1e3
+            full = full or wall
+            label = "completa" if tol is None else f"{tol:g} V"
+            print(f"{label:>12} {n:9.1f} {wall:8.3f} {1-wall/full:7.0%} {err:17.3f}")
+    finally:
+        reader.stop()
+        emu.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+# Micro-benchmark del parser: genera corridas sintéticas con el mismo texto
+# que imprime nuevo_codiog.ino y mide líneas/s alimentando trozos de bytes.
+#
+#   python benchmarks/bench_protocolo.py [n_lineas] [tam_trozo]
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from protocolo import ProtocolParser, END  # noqa: E402
+
+N_MUESTRAS = 100
+
+
+def synthetic_session(n_lines, seed=0):
+    rng = np.random.default_rng(seed)
+    parts = [b"=== Calibraci\xc3\xb3n de flujo ===\r\n",
+             b"Escribe valor del anem\xc3\xb3metro (slm) y Enter.\r\n"]
+    lines = 2
+    while lines < n_lines:
+        ref = float(rng.uniform(0, 100))
+        volts = rng.normal(2.5, 0.05, N_MUESTRAS)
+        parts.append(b"\r\n--> Referencia recibida: %.2f slm  (iniciando medici\xc3\xb3n\xe2\x80\xa6)\r\n\r\n" % ref)
+        parts.append(b">> Medici\xc3\xb3n en curso, espera...\r\n")
+        parts.append(b"".join(b"%.2f\r\n" % v for v in volts))
+        flow = 212.5*(volts.mean()/5 - 0.1) - 10
+        parts.append(b"Promedio flujo = %.2f slm\r\n" % flow)
+        parts.append(b"Precisi\xc3\xb3n (\xcf\x83) = %.4f V\r\n" % volts.std(ddof=1))
+        parts.append(b"Exactitud (abs) = %.2f slm\r\n\r\n" % abs(ref-flow))
+        parts.append(b"Escribe nueva referencia\r\n")
+        lines += N_MUESTRAS + 10
+    return b"".join(parts), lines
+
+
+def main():
+    n_lines = int(sys.argv[1]) if len(sys.argv) > 1 else 3_000_000
+    chunk = int(sys.argv[2]) if len(sys.argv) > 2 else 4096
+    data, lines = synthetic_session(n_lines)
+    parser = ProtocolParser()
+    runs = samples = 0
+    t0 = time.perf_counter()
+    for i in range(0, len(data), chunk):
+        for kind, val, _ in parser.feed(data[i:i+chunk]):
+            if kind == END:
+                runs += 1; samples += len(val)
+    dt = time.perf_counter() - t0
+    print(f"{lines} líneas, {len(data)/1e6:.1f} MB, trozo {chunk} B")
+    print(f"{runs} corridas, {samples} muestras en {dt:.2f} s")
+    print(f"{lines/dt:,.0f} líneas/s  ({len(data)/dt/1e6:.1f} MB/s)")
+
+
+if __name__ == "__main__":
+    main()
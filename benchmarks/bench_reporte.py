@@ -0,0 +1,47 @@
+# Tiempo de armado del reporte PDF según número de experimentos y muestras,
+# con las gráficas en frío (render) y en caliente (PNG cacheado).
+#
+#   python benchmarks/bench_reporte.py
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from reporte import _PNG_CACHE, build_pdf, snapshot  # noqa: E402
+from sesion import CalibrationSession  # noqa: E402
+
+CASES = [(10, 100), (100, 100), (1000, 100), (100, 1000), (10, 10000)]
+
+
+def synthetic_session(n_exp, n_samples, seed=0):
+    rng = np.random.default_rng(seed)
+    s = CalibrationSession()
+    s.set_offset(0.5, 0.01, n_samples)
+    for ref in np.linspace(5, 100, n_exp):
+        meas = rng.normal(0.5 + ref*0.04, 0.02, n_samples)
+        s.add_run({'ref': ref, 'flowAvg': ref, 'prec': float(meas.std(ddof=1)),
+                   'offset': None, 'meas': meas})
+    return s
+
+
+def main():
+    print(f"{'exps':>6} {'muestras':>9} {'snapshot':>9} {'frío':>8} {'caliente':>9}  (ms)")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "r.pdf")
+        for n_exp, n_samples in CASES:
+            s = synthetic_session(n_exp, n_samples)
+            t0 = time.perf_counter()
+            snap = snapshot(s, s.fit('ols'))
+            t_snap = time.perf_counter() - t0
+            _PNG_CACHE.clear()
+            t0 = time.perf_counter(); build_pdf(path, snap); t_cold = time.perf_counter() - t0
+            t0 = time.perf_counter(); build_pdf(path, snap); t_warm = time.perf_counter() - t0
+            print(f"{n_exp:>6} {n_samples:>9} {t_snap*1e3:>9.1f} {t_cold*1e3:>8.0f} {t_warm*1e3:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# Prueba aleatoria de ExperimentStore contra un modelo de listas: altas,
+# altas en bloque, borrados y compactaciones mezclados, comparando después
+# de cada paso filas, columnas, muestras y packed(). Sale con 1 al primer
+# desacuerdo. Es lo que vigila lápidas, índice de filas vivas y compactación.
+#
+#   python benchmarks/check_almacen.py [operaciones] [semilla]
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from almacen import COLUMNS, ExperimentStore  # noqa: E402
+
+
+def random_run(rng):
+    n = int(rng.integers(1, 40))
+    meas = rng.normal(2.5, 0.05, n)
+    offset = None if rng.random() < 0.8 else float(rng.normal(0.5, 0.01))
+    return (float(rng.uniform(0, 100)), float(rng.uniform(0, 100)),
+            float(rng.random()), float(rng.random()), meas, offset)
+
+
+def stats(run):
+    # columnas que calcula append(), para armar el extend() equivalente
+    ref, flowAvg, prec, exact, meas, offset = run
+    mu = meas.mean()
+    return {'ref': ref, 'flowAvg': flowAvg, 'voltAvg': mu, 'prec': prec,
+            'exact': exact, 'offset': np.nan if offset is None else offset,
+            'std': meas.std(), 'worst': np.max(np.abs(meas-mu))/mu*100}
+
+
+def check(store, model):
+    assert len(store) == len(model), (len(store), len(model))
+    for c in COLUMNS:
+        want = np.array([stats(r)[c] for r in model])
+        assert np.allclose(store.column(c), want, equal_nan=True), c
+    assert list(store.lengths()) == [len(r[4]) for r in model]
+    for i, run in enumerate(model):
+        assert np.array_equal(store.samples(i), run[4]), i
+        assert store[i]['offset'] == run[5], i
+    flat, lengths = store.packed()
+    want = np.concatenate([r[4] for r in model]) if model else np.empty(0)
+    assert np.array_equal(flat, want)
+    assert list(lengths) == [len(r[4]) for r in model]
+
+
+def main():
+    n_ops = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    rng = np.random.default_rng(seed)
+    # capacidades chicas para que también se ejerciten los _reserve
+    store, model = ExperimentStore(run_capacity=2, sample_capacity=16), []
+    for op in range(n_ops):
+        p = rng.random()
+        try:
+            if p < 0.4:
+                run = random_run(rng)
+                assert store.append(*run) == len(model)
+                model.append(run)
+            elif p < 0.5:
+                runs = [random_run(rng) for _ in range(int(rng.integers(0, 6)))]
+                cols = {c: np.array([stats(r)[c] for r in runs]) for c in COLUMNS}
+                lengths = [len(r[4]) for r in runs]
+                samples = np.concatenate([r[4] for r in runs]) if runs else np.empty(0)
+                assert store.extend(cols, lengths, samples) == range(len(model), len(model)+len(runs))
+                model.extend(runs)
+            elif p < 0.9 and model:
+                i = int(rng.integers(-len(model), len(model)))
+                store.delete(i)
+                del model[i]
+            elif p < 0.99:
+                store.compact()
+            else:
+                store.clear()
+                model.clear()
+            check(store, model)
+        except AssertionError as e:
+            print(f"desacuerdo en la operación {op} (semilla {seed}): {e!r}")
+            return 1
+    print(f"{n_ops} operaciones, {len(model)} corridas vivas al final: OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+import numpy as np
+
+# σ mínimo para pesar un punto: ruido de cuantización del ADC (5 V / 1024)
+SIGMA_MIN = 5.0/1024/np.sqrt(12)
+
+MODES = {'ordinario': 'ols', 'ponderado σ': 'wls', 'robusto': 'robust'}
+
+
+def sigma_weight(sigma, n=1):
+    # peso 1/σ² de la media de la corrida (σ/√n)
+    if sigma is None or not np.isfinite(sigma):
+        sigma = SIGMA_MIN
+    sigma = max(float(sigma), SIGMA_MIN)
+    return n/(sigma*sigma)
+
+
+def _solve(sw, sx, sy, sxx, sxy, syy):
+    # (m, b, R²) a partir de sumas ponderadas; None si no hay recta
+    if sw <= 0:
+        return None
+    cxx = sxx - sx*sx/sw
+    cxy = sxy - sx*sy/sw
+    cyy = syy - sy*sy/sw
+    if cxx <= 1e-12*max(sxx, 1.0):
+        return None
+    m = cxy/cxx
+    b = (sy - m*sx)/sw
+    r2 = cxy*cxy/(cxx*cyy) if cyy > 0 else 1.0
+    return m, b, min(r2, 1.0)
+
+
+# Ajuste lineal por mínimos cuadrados con sumas suficientes acumuladas
+# (Σw, Σwx, Σwy, Σwxy, Σwx², Σwy²): agregar o quitar un punto es O(1).
+class RunningLinearFit:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.n = 0
+        self.sw = self.sx = self.sy = self.sxx = self.sxy = self.syy = 0.0
+
+    def add(self, x, y, w=1.0):
+        self._acc(x, y, w, 1)
+
+    def remove(self, x, y, w=1.0):
+        self._acc(x, y, w, -1)
+
+    def _acc(self, x, y, w, sign):
+        self.n += sign
+        wx, wy = sign*w*x, sign*w*y
+        self.sw += sign*w
+        self.sx += wx
+        self.sy += wy
+        self.sxx += wx*x
+        self.sxy += wx*y
+        self.syy += wy*y
+        if self.n == 0:
+            self.reset()   # evita arrastrar error de redondeo
+
+    def fit(self):
+        if self.n < 2:
+            return None
+        return _solve(self.sw, self.sx, self.sy, self.sxx, self.sxy, self.syy)
+
+
+# Media y σ de una corrida mientras llegan las muestras (Welford). add_many
+# junta un bloque entero con la fórmula de Chan: las tramas binarias no se
+# recorren muestra a muestra.
+class RunningStats:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.n = 0
+        self.mean = self._m2 = 0.0
+
+    def add(self, x):
+        self.n += 1
+        d = x - self.mean
+        self.mean += d/self.n
+        self._m2 += d*(x - self.mean)
+
+    def add_many(self, xs):
+        xs = np.asarray(xs, dtype=float)
+        k = len(xs)
+        if not k:
+            return
+        mb = float(xs.mean())
+        n = self.n + k
+        d = mb - self.mean
+        self._m2 += float(((xs - mb)**2).sum()) + d*d*self.n*k/n
+        self.mean += d*k/n
+        self.n = n
+
+    @property
+    def std(self):
+        # muestral (n-1), igual que calcularPrecision del sketch
+        return (self._m2/(self.n - 1))**0.5 if self.n > 1 else 0.0
+
+    @property
+    def sem(self):
+        # σ de la media
+        return self.std/self.n**0.5 if self.n > 1 else float('inf')
+
+    def settled(self, tol, n_min=10):
+        # regla de parada anticipada: σ de la media por debajo de tol
+        return self.n >= n_min and self.sem < tol
+
+
+def weighted_fit(x, y, w=None):
+    x = np.asarray(x, dtype=float); y = np.asarray(y, dtype=float)
+    w = np.ones_like(x) if w is None else np.asarray(w, dtype=float)
+    if np.count_nonzero(w) < 2:
+        return None
+    wx, wy = w*x, w*y
+    return _solve(w.sum(), wx.sum(), wy.sum(), (wx*x).sum(), (wx*y).sum(), (wy*y).sum())
+
+
+def robust_fit(x, y, w=None, c=4.685, iters=20):
+    # IRLS con peso bicuadrado de Tukey sobre residuos escalados por MAD;
+    # devuelve el ajuste y la máscara de puntos que quedaron con peso > 0
+    x = np.asarray(x, dtype=float); y = np.asarray(y, dtype=float)
+    w = np.ones_like(x) if w is None else np.asarray(w, dtype=float)
+    inliers = np.ones(len(x), dtype=bool)
+    fit = weighted_fit(x, y, w)
+    if fit is None or len(x) < 3:
+        return fit, inliers
+    for _ in range(iters):
+        m, b, _ = fit
+        r = y - (m*x + b)
+        s = 1.4826*np.median(np.abs(r - np.median(r)))
+        if s <= 0:
+            break
+        u = r/(c*s)
+        bw = np.where(np.abs(u) < 1, (1 - u*u)**2, 0.0)
+        new = weighted_fit(x, y, w*bw)
+        if new is None:
+            break
+        inliers = bw > 0
+        done = abs(new[0]-m) <= 1e-10*max(abs(m), 1.0) and abs(new[1]-b) <= 1e-10*max(abs(b), 1.0)
+        fit = new
+        if done:
+            break
+    return fit, inliers
+
+
+# Modelo de calibración de la app: mantiene a la vez el ajuste ordinario y
+# el ponderado por σ para que cambiar de modo no cueste nada. El robusto
+# necesita los puntos y se recalcula aparte con robust_fit.
+class CalibrationModel:
+    def __init__(self):
+        self.ols = RunningLinearFit()
+        self.wls = RunningLinearFit()
+
+    def reset(self):
+        self.ols.reset(); self.wls.reset()
+
+    def add(self, x, y, sigma=None, n=1):
+        self.ols.add(x, y)
+        self.wls.add(x, y, sigma_weight(sigma, n))
+
+    def remove(self, x, y, sigma=None, n=1):
+        self.ols.remove(x, y)
+        self.wls.remove(x, y, sigma_weight(sigma, n))
+
+    def add_many(self, x, y, sigma, n):
+        # lo mismo que add() punto a punto, con sumas vectorizadas
+        x = np.asarray(x, dtype=float); y = np.asarray(y, dtype=float)
+        sigma = np.asarray(sigma, dtype=float)
+        sigma = np.where(np.isfinite(sigma), sigma, SIGMA_MIN)
+        w = np.asarray(n, dtype=float)/np.maximum(sigma, SIGMA_MIN)**2
+        for acc, ww in ((self.ols, np.ones_like(x)), (self.wls, w)):
+            wx, wy = ww*x, ww*y
+            acc.n += len(x)
+            acc.sw += ww.sum(); acc.sx += wx.sum(); acc.sy += wy.sum()
+            acc.sxx += (wx*x).sum(); acc.sxy += (wx*y).sum(); acc.syy += (wy*y).sum()
+
+    def fit(self, mode='ols'):
+        return (self.wls if mode == 'wls' else self.ols).fit()
@@ -0,0 +1,107 @@
+import tkinter as tk
+from tkinter import ttk, filedialog
+
+
+# Consola del puerto serie acotada: el Text muestra como mucho max_lines
+# líneas (se recorta en bloque al pasarse un 10 %), las líneas pendientes se
+# insertan de una vez por tick y el log completo queda en memoria (self.log)
+# para filtrar, reanudar tras la pausa o guardarlo a disco. clear() solo
+# limpia lo visible: el log sigue entero para "Guardar log".
+class SerialConsole(ttk.Frame):
+    TRIM_SLACK = 0.1
+
+    def __init__(self, master, max_lines=5000, height=8):
+        super().__init__(master, style="TFrame")
+        self.max_lines = max_lines
+        self.log = []
+        self._pending = []
+        self._shown = 0
+        self._start = 0          # primera línea del log que se puede mostrar
+        self._flush_id = None
+
+        bar = ttk.Frame(self, style="TFrame")
+        bar.pack(fill=tk.X)
+        self.pause_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(bar, text="Pausa", variable=self.pause_var,
+                        command=self._on_pause).pack(side=tk.LEFT)
+        ttk.Label(bar, text="Filtro:").pack(side=tk.LEFT, padx=(10,2))
+        self.filter_var = tk.StringVar(value="")
+        ttk.Entry(bar, textvariable=self.filter_var, width=20).pack(side=tk.LEFT)
+        self.filter_var.trace_add('write', lambda *_: self._rebuild())
+        ttk.Button(bar, text="Guardar log", command=self.save_log).pack(side=tk.RIGHT)
+
+        body = ttk.Frame(self, style="TFrame")
+        body.pack(fill=tk.BOTH, expand=True)
+        self.text = tk.Text(body, height=height, state='disabled', bg="#e8e8e8", font=("Consolas",10))
+        sb = ttk.Scrollbar(body, orient='vertical', command=self.text.yview)
+        self.text['yscrollcommand'] = sb.set
+        self.text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        sb.pack(side=tk.RIGHT, fill=tk.Y)
+
+    def append_lines(self, lines):
+        if not lines: return
+        self.log.extend(lines)
+        if self.pause_var.get(): return
+        f = self.filter_var.get()
+        if f:
+            lines = [l for l in lines if f in l]
+        if not lines: return
+        self._pending.extend(lines)
+        if self._flush_id is None:
+            self._flush_id = self.after_idle(self.flush)
+
+    def flush(self):
+        self._flush_id = None
+        lines, self._pending = self._pending, []
+        if not lines: return
+        if len(lines) > self.max_lines:
+            lines = lines[-self.max_lines:]
+        t = self.text
+        follow = t.yview()[1] >= 0.999   # solo autoscroll si se está al final
+        t.configure(state='normal')
+        t.insert('end', "\n".join(lines)+"\n")
+        self._shown += len(lines)
+        excess = self._shown - self.max_lines
+        if excess > self.max_lines*self.TRIM_SLACK:
+            t.delete('1.0', f'{excess+1}.0')
+            self._shown -= excess
+        t.configure(state='disabled')
+        if follow: t.see('end')
+
+    def clear(self):
+        self._start = len(self.log)
+        self._pending = []
+        self._set_text([])
+
+    def save_log(self):
+        path = filedialog.asksaveasfilename(defaultextension=".txt", filetypes=[("Texto","*.txt")])
+        if not path: return
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(self.log)+"\n")
+
+    def _on_pause(self):
+        if not self.pause_var.get():
+            self._rebuild()
+
+    def _rebuild(self):
+        # las últimas max_lines del log que pasan el filtro
+        f = self.filter_var.get()
+        out = []
+        for i in range(len(self.log)-1, self._start-1, -1):
+            l = self.log[i]
+            if not f or f in l:
+                out.append(l)
+                if len(out) == self.max_lines: break
+        out.reverse()
+        self._pending = []
+        self._set_text(out)
+
+    def _set_text(self, lines):
+        t = self.text
+        t.configure(state='normal')
+        t.delete('1.0', 'end')
+        if lines:
+            t.insert('end', "\n".join(lines)+"\n")
+        t.configure(state='disabled')
+        t.see('end')
+        self._shown = len(lines)
@@ -0,0 +1,73 @@
+import tkinter as tk
+from tkinter import ttk, filedialog
+
+from instrumentacion import QUANTILES
+
+
+def _fmt(v, unit):
+    if unit == 's':
+        return f"{v*1e3:.3f}"   # en ms
+    return f"{v:g}"
+
+
+# Ventana de diagnóstico: tabla por etapa (n, media, percentiles, máximo),
+# contadores y exportación a JSON/CSV. Se refresca sola cada REFRESH_MS
+# leyendo los histogramas; no guarda nada propio.
+class DiagnosticsWindow(tk.Toplevel):
+    REFRESH_MS = 500
+
+    def __init__(self, master, perf):
+        super().__init__(master)
+        self.perf = perf
+        self.title("Diagnóstico de rendimiento")
+        self.geometry("640x420")
+
+        cols = ['n', 'media'] + [f"p{round(q*100)}" for q in QUANTILES] + ['max']
+        self.tree = ttk.Treeview(self, columns=cols, height=12)
+        self.tree.heading('#0', text="Etapa (tiempos en ms)")
+        self.tree.column('#0', width=200)
+        for c in cols:
+            self.tree.heading(c, text=c)
+            self.tree.column(c, width=70, anchor=tk.E)
+        self.tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=(10,5))
+
+        self.counters_var = tk.StringVar(value="")
+        ttk.Label(self, textvariable=self.counters_var, justify=tk.LEFT).pack(anchor=tk.W, padx=10)
+
+        bar = ttk.Frame(self)
+        bar.pack(fill=tk.X, padx=10, pady=10)
+        ttk.Button(bar, text="Exportar JSON", command=self.export_json).pack(side=tk.LEFT)
+        ttk.Button(bar, text="Exportar CSV", command=self.export_csv).pack(side=tk.LEFT, padx=5)
+        ttk.Button(bar, text="Reiniciar", command=self.perf.reset).pack(side=tk.RIGHT)
+
+        self._after_id = None
+        self._refresh()
+
+    def destroy(self):
+        # sin esto queda un after() apuntando a un comando Tcl ya borrado
+        if self._after_id is not None:
+            self.after_cancel(self._after_id)
+            self._after_id = None
+        super().destroy()
+
+    def _refresh(self):
+        tree = self.tree
+        for name, h in sorted(self.perf.hist.items()):
+            s = h.summary()
+            vals = [s['n']] + [_fmt(s[k], h.unit) for k in tree['columns'][1:]]
+            if tree.exists(name):
+                tree.item(name, values=vals)
+            else:
+                tree.insert('', 'end', iid=name, text=name, values=vals)
+        self.counters_var.set("   ".join(f"{k}: {v}" for k, v in sorted(self.perf.totals().items())))
+        self._after_id = self.after(self.REFRESH_MS, self._refresh)
+
+    def export_json(self):
+        path = filedialog.asksaveasfilename(parent=self, defaultextension=".json",
+                                            filetypes=[("JSON","*.json")])
+        if path: self.perf.to_json(path)
+
+    def export_csv(self):
+        path = filedialog.asksaveasfilename(parent=self, defaultextension=".csv",
+                                            filetypes=[("CSV","*.csv")])
+        if path: self.perf.to_csv(path)
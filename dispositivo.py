@@ -0,0 +1,116 @@
+import time
+from array import array
+
+from adquisicion import SerialReader, drain
+from calibracion import RunningStats
+from instrumentacion import PERF, timed
+from protocolo import END, REF, RESET, SAMPLE, SAMPLES, RunAssembler
+from sesion import CalibrationSession
+
+
+# Un equipo del banco: puerto, hilo lector, sesión propia y estado de la
+# corrida en curso. La app tiene uno por puerto abierto y a todos les manda
+# la misma referencia; la UI muestra uno a la vez. Sin Tk: lo usan también
+# los benchmarks.
+#
+# Un resumen solo cuenta si la corrida trajo el eco de su referencia: lo que
+# se manda mientras el sketch todavía mide queda en su buffer, y el resumen
+# que llega primero es de la corrida anterior (se descarta, ver discarded).
+# idle dice si desde el último comando ya llegó un resumen del sketch.
+class Device:
+    def __init__(self, ser, name=None, session=None):
+        self.name = name or ser.port
+        self.ser = ser
+        self.reader = SerialReader(ser)
+        self.session = session if session is not None else CalibrationSession()
+        self.run = None
+        self.stats = RunningStats()
+        self.live = array('d')   # muestras de la corrida en curso
+        self.idle = True
+        self.discarded = 0       # resúmenes de otra referencia descartados
+        self._asm = RunAssembler()
+
+    def start(self):
+        self.reader.start()
+        return self
+
+    def stop(self):
+        self.reader.stop()
+
+    @property
+    def alive(self):
+        return self.reader.is_alive()
+
+    @property
+    def busy(self):
+        return self.run is not None
+
+    def drain_events(self):
+        events = drain(self.reader.events)
+        if PERF:
+            # espera en la cola (bloque leído → drenado) y profundidad
+            now = time.perf_counter()
+            for t, k in drain(self.reader.stamps):
+                if k: PERF.add("cola.espera", now - t, k)
+            PERF.histogram("cola.eventos", lo=1, unit='').add(len(events))
+        return events
+
+    def start_run(self, ref, now):
+        # devuelve lo que quedaba en cola: es de antes, solo para la consola
+        old = self.drain_events()
+        # el sketch lee a lo sumo 15 caracteres por comando y hace eco con 2
+        # decimales: se manda así y la referencia completa queda en self.run
+        self.reader.write(f"{ref:.2f}\n".encode(), reset_input=True)
+        self.run = {'ref': ref, 't0': now, 'armed': False, 'stop_sent': False}
+        self.idle = False
+        return old
+
+    def abort(self):
+        self.run = None
+
+    def request_stop(self):
+        # parada anticipada: una sola vez por corrida
+        self.reader.write(b"s\n")
+        self.run['stop_sent'] = True
+
+    @timed("corrida.estadistica")
+    def feed(self, events):
+        # (corrida terminada o None, llegaron muestras nuevas)
+        run = self.run
+        if run is None:
+            if not self.idle and any(ev[0] == END for ev in events):
+                self.idle = True
+            return None, False
+        stats, live = self.stats, self.live
+        fresh = False
+        for kind, val, _ in events:
+            if kind == RESET:
+                run['armed'] = True
+                self._asm.reset()
+                stats.reset(); del live[:]
+            elif run['armed']:
+                if kind == REF:
+                    # arranca una corrida: lo anterior era de otra
+                    stats.reset(); del live[:]
+                elif kind == SAMPLE:
+                    stats.add(val); live.append(val); fresh = True
+                elif kind == SAMPLES:
+                    stats.add_many(val); live.extend(val); fresh = True
+                done = self._asm.push(kind, val)
+                if done is None:
+                    continue
+                self.idle = True
+                # done['ref'] es el eco visto en esta corrida (None si no hubo)
+                if done['ref'] is None or abs(done['ref'] - round(run['ref'], 2)) > 0.005:
+                    # resumen de una corrida vieja: la nuestra todavía no empezó
+                    self.discarded += 1
+                    stats.reset(); del live[:]
+                    if PERF: PERF.count("corridas.descartadas")
+                    continue
+                done['ref'] = run['ref']   # el eco solo trae 2 decimales
+                self.run = None
+                if PERF:
+                    PERF.add("corrida.duracion", time.time() - run['t0'])
+                    PERF.count("corridas")
+                return done, fresh
+        return None, fresh
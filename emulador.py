@@ -0,0 +1,266 @@
+# Emulador en Python del protocolo serie de nuevo_codiog.ino: bienvenida,
+# eco de la referencia, N muestras, resumen flujo/σ/exactitud, offset cuando
+# ref = 0, volcado CSV con 'q', modo binario con 'b<baud>[,<ms>]' / 't' y
+# parada anticipada con 's' durante la corrida.
+# Se expone por un pseudo-terminal (pty) que pyserial abre como un puerto
+# cualquiera, así se prueba la app sin placa.
+#
+#   python emulador.py --muestras 1000 --retardo 0.001
+import os
+import re
+import select
+import sys
+import threading
+import time
+
+import numpy as np
+
+from protocolo import FRAME_SAMPLES, PAD, SYNC
+
+N_MUESTRAS = 100
+TIEMPO_MUESTREO_S = 0.1
+MAX_CORRIDAS = 50
+BUF_LEN = 15   # readBytesUntil(..., sizeof(buf) - 1)
+MIN_MUESTRAS = 10
+BAUD_TEXTO = 9600
+
+_LEADING_INT = re.compile(rb'\s*([-+]?\d+)')
+
+
+def atol(buf):
+    # como atol/atoi de C: el entero del principio, 0 si no hay
+    m = _LEADING_INT.match(buf)
+    return int(m.group(1)) if m else 0
+
+
+def flow_to_volt(flow):
+    # inversa de flujo = 212.5*(volt/5 - 0.1) - 10 del sketch
+    return 5.0*((flow + 10.0)/212.5 + 0.1)
+
+
+# Lógica del sketch, independiente del transporte: write(bytes) manda a la
+# "línea serie". noise(rng, n) devuelve n valores de ruido en V; por defecto
+# gaussiano de noise_sigma. baud, si se da, agrega el tiempo de transmisión.
+# poll_stop() dice si llegó un "s" mientras se mide (pidioParada del sketch).
+class FirmwareEmulator:
+    def __init__(self, write, n_samples=N_MUESTRAS, sample_delay=TIEMPO_MUESTREO_S,
+                 noise_sigma=0.01, noise=None, baud=None, flow_gain=1.0, seed=None,
+                 poll_stop=None):
+        self._write = write
+        self.poll_stop = poll_stop or (lambda: False)
+        self.n_samples = n_samples
+        self.sample_delay = sample_delay
+        self.noise = noise or (lambda rng, n: rng.normal(0.0, noise_sigma, n))
+        self.baud = baud
+        self.flow_gain = flow_gain
+        self.rng = np.random.default_rng(seed)
+        self.runs = []          # (ref, promV, promF, desv, errAbs)
+        self.offset_v = 0.0
+        self.halted = False
+        self.binary = False
+        self.seq = 0
+        self.sample_times = []  # perf_counter de cada muestra de la última corrida
+
+    # ── Salida ───────────────────────────────────────────────────────────
+    def write(self, data):
+        self._write(data)
+        if self.baud:
+            time.sleep(len(data)*10/self.baud)   # 8N1: 10 bits por byte
+
+    def println(self, text=""):
+        self.write(text.encode() + b"\r\n")
+
+    # ── Entrada ──────────────────────────────────────────────────────────
+    def welcome(self):
+        self.println("=== Calibración de flujo ===")
+        self.println("Escribe valor del anemómetro (slm) y Enter.")
+
+    def handle_line(self, line):
+        if self.halted:
+            return
+        buf = line[:BUF_LEN].rstrip(b"\r")
+        if buf.lower() == b"q":
+            self.print_csv()
+            self.halted = True   # while (1) ;
+            return
+        if not buf or buf[:1] in (b"s", b"S"):
+            return
+        if buf[:1] in (b"b", b"B"):
+            baud, comma, period = buf[1:].partition(b",")
+            baud = atol(baud)
+            if baud <= 0:
+                baud = BAUD_TEXTO   # cambiarModo
+            self.println(f"Modo binario: {baud} baud")
+            self.binary = True
+            self.baud = self.baud and baud   # solo si se está simulando el enlace
+            # sin periodo el sketch vuelve a 100 ms; acá se deja el del
+            # constructor para que los benchmarks elijan el ritmo
+            if comma:
+                self.sample_delay = max(atol(period), 1)/1000.0
+            return
+        if buf[:1] in (b"t", b"T"):
+            self.println(f"Modo texto: {BAUD_TEXTO} baud")
+            self.binary = False
+            self.baud = self.baud and BAUD_TEXTO
+            self.sample_delay = TIEMPO_MUESTREO_S
+            return
+        try:
+            ref = float(buf.split()[0])   # atof: lo que no es número vale 0
+        except (ValueError, IndexError):
+            ref = 0.0
+        self.println(f"\n--> Referencia recibida: {ref:.2f} slm  (iniciando medición…)\n")
+        self.measure(ref)
+
+    # ── Corrida ──────────────────────────────────────────────────────────
+    def adc_counts(self, ref, n):
+        true_v = flow_to_volt(ref*self.flow_gain) if ref else flow_to_volt(0.0)
+        v = true_v + self.noise(self.rng, n)
+        return np.clip(np.rint(v*1023/5.0), 0, 1023).astype(np.uint16)
+
+    def measure(self, ref):
+        self.println(">> Medición en curso, espera...")
+        counts = self.adc_counts(ref, self.n_samples)
+        volts = counts*5.0/1023.0
+        times = self.sample_times = []
+        frame = []
+        n = len(counts)
+        for i, (c, v) in enumerate(zip(counts.tolist(), volts.tolist())):
+            if self.sample_delay:
+                time.sleep(self.sample_delay)
+            if self.binary:
+                frame.append(c)
+                if len(frame) == FRAME_SAMPLES:
+                    self.send_frame(frame); frame = []
+            else:
+                self.println(f"{v:.2f}")
+            times.append(time.perf_counter())
+            if i + 1 >= MIN_MUESTRAS and self.poll_stop():
+                n = i + 1
+                break
+        if frame:
+            self.send_frame(frame)
+        self.summary(ref, volts[:n])
+
+    def send_frame(self, counts):
+        counts = counts + [PAD]*(FRAME_SAMPLES - len(counts))
+        body = bytes([self.seq]) + np.array(counts, dtype='<u2').tobytes()
+        self.write(SYNC + body + bytes([sum(body) & 0xff]))
+        self.seq = (self.seq + 1) % 256
+
+    def summary(self, ref, volts):
+        n = len(volts)
+        promV = float(volts.mean()) if n else 0.0
+        promF = float((212.5*(volts/5.0 - 0.1) - 10.0).mean()) if n else 0.0
+        if ref == 0.0:
+            self.offset_v = promV
+            self.println(f"Offset calculado = {promV:.4f} V\n")
+            self.println("Envía ahora una referencia > 0")
+            return
+        desv = float(volts.std(ddof=1)) if n > 1 else 0.0
+        errAbs = abs(ref - promF)
+        if len(self.runs) < MAX_CORRIDAS:
+            self.runs.append((ref, promV, promF, desv, errAbs))
+        else:
+            self.println(">> Memoria llena: corrida descartada")
+        self.println(f"Promedio flujo = {promF:.2f} slm")
+        self.println(f"Precisión (σ) = {desv:.4f} V")
+        self.println(f"Exactitud (abs) = {errAbs:.2f} slm\n")
+        self.println("Escribe nueva referencia")
+
+    def print_csv(self):
+        self.println("\n====== RESULTADOS CSV ======")
+        self.println("Ref(slm)   FlujoAvg(slm)  VoltAvg(V)  Prec(%)  Exact(%)")
+        for ref, promV, promF, desv, errAbs in self.runs:
+            p = desv/promV*100.0 if promV else float('inf')
+            e = errAbs/promF*100.0 if promF else float('inf')
+            self.println(f"{ref:.2f}       {promF:.2f}         {promV:.2f}       {p:.2f}      {e:.2f}")
+        self.println("============================")
+        self.println("Copia y pega en Excel :)")
+
+
+# El emulador detrás de un pty: self.port es el nombre del esclavo
+# (/dev/pts/N) para serial.Serial. Solo POSIX.
+class PtyEmulator(threading.Thread):
+    def __init__(self, **kwargs):
+        import tty
+        super().__init__(daemon=True)
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)   # sin eco ni traducción de \n
+        self.port = os.ttyname(self._slave)
+        self.firmware = FirmwareEmulator(self._os_write, poll_stop=self._poll_stop, **kwargs)
+        self._stop_evt = threading.Event()
+        self._pending = b""
+
+    def _os_write(self, data):
+        view = memoryview(data)
+        while view:
+            n = os.write(self._master, view)
+            view = view[n:]
+
+    def _poll_stop(self):
+        # lo que llegó durante la corrida queda en _pending salvo la línea "s"
+        while select.select([self._master], [], [], 0)[0]:
+            try:
+                self._pending += os.read(self._master, 4096)
+            except OSError:
+                return False
+        if self._pending[:1] not in (b"s", b"S"):
+            return False
+        _, nl, rest = self._pending.partition(b"\n")
+        if not nl:
+            return False
+        self._pending = rest
+        return True
+
+    def stop(self):
+        self._stop_evt.set()
+        self.join(1.0)
+        for fd in (self._master, self._slave):
+            try: os.close(fd)
+            except OSError: pass
+
+    def run(self):
+        self.firmware.welcome()
+        while not self._stop_evt.is_set():
+            if b"\n" not in self._pending:
+                r, _, _ = select.select([self._master], [], [], 0.1)
+                if not r:
+                    continue
+                try:
+                    self._pending += os.read(self._master, 4096)
+                except OSError:
+                    break
+            # de a una línea: la corrida puede consumir lo que llegue mientras mide
+            line, nl, rest = self._pending.partition(b"\n")
+            if nl:
+                # readBytesUntil corta en BUF_LEN y lo demás queda en el buffer:
+                # el sketch lo lee como el comando siguiente
+                if len(line) > BUF_LEN:
+                    line, rest = line[:BUF_LEN], line[BUF_LEN:] + nl + rest
+                self._pending = rest
+                self.firmware.handle_line(line)
+
+
+def main(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser(description="Emula nuevo_codiog.ino sobre un pty.")
+    ap.add_argument("--muestras", type=int, default=N_MUESTRAS)
+    ap.add_argument("--retardo", type=float, default=TIEMPO_MUESTREO_S, help="s entre muestras")
+    ap.add_argument("--ruido", type=float, default=0.01, help="σ del ruido en V")
+    ap.add_argument("--baud", type=int, default=None, help="simular la velocidad del enlace")
+    args = ap.parse_args(argv)
+    emu = PtyEmulator(n_samples=args.muestras, sample_delay=args.retardo,
+                      noise_sigma=args.ruido, baud=args.baud)
+    emu.start()
+    print(f"Emulador escuchando en {emu.port} (Ctrl+C para salir)")
+    try:
+        while emu.is_alive():
+            emu.join(0.5)
+    except KeyboardInterrupt:
+        pass
+    emu.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,433 @@
+import numpy as np
+from matplotlib.patches import Rectangle
+from matplotlib.ticker import MaxNLocator
+
+from instrumentacion import timed
+
+
+def minmax_decimate(y, n_out):
+    # a lo sumo ~n_out puntos: mínimo y máximo de cada bloque, en el orden en
+    # que aparecen, así la envolvente y los picos quedan igual que sin diezmar.
+    # Devuelve (índices desde 1, valores).
+    y = np.asarray(y)
+    n = len(y)
+    k = n_out//2
+    if n <= n_out or k == 0:
+        return np.arange(1, n+1), y
+    size = n//k
+    m = size*k
+    blocks = y[:m].reshape(k, size)
+    i0, i1 = blocks.argmin(axis=1), blocks.argmax(axis=1)
+    base = np.arange(k)*size
+    idx = np.column_stack([base + np.minimum(i0, i1), base + np.maximum(i0, i1)]).ravel()
+    if m < n:   # cola que no llena un bloque
+        tail = m + np.array([y[m:].argmin(), y[m:].argmax()])
+        idx = np.append(idx, np.sort(tail))
+    return idx + 1, y[idx]
+
+
+def grid_thin(pts, cells):
+    # índices (ordenados) del primer punto de cada celda de una grilla de
+    # cells=(nx, ny) sobre el rango de los datos
+    pts = np.asarray(pts, dtype=float)
+    lo, hi = pts.min(axis=0), pts.max(axis=0)
+    span = np.where(hi > lo, hi-lo, 1.0)
+    nx, ny = cells
+    ij = np.minimum(((pts-lo)/span*[nx, ny]).astype(np.intp), [nx-1, ny-1])
+    _, keep = np.unique(ij[:, 0]*ny + ij[:, 1], return_index=True)
+    return np.sort(keep)
+
+
+def group_max(values, group):
+    # máximo por grupos consecutivos de `group` valores (el último puede ser corto)
+    values = np.asarray(values, dtype=float)
+    if group <= 1 or not len(values):
+        return values
+    return np.maximum.reduceat(values, np.arange(0, len(values), group))
+
+
+# Las tres gráficas de la app con artistas persistentes: los datos se
+# actualizan en sitio (set_offsets / set_data / set_height) y el resaltado de
+# la selección va animado y se pinta con blitting sobre un fondo cacheado.
+# Sirve con cualquier canvas (TkAgg en la app, Agg en los benchmarks).
+#
+# Nivel de detalle: lo que se dibuja está acotado sin importar el tamaño de
+# los datos. Por encima de SCATTER_MAX el scatter muestra un punto por celda
+# de SCATTER_GRID (el pick se traduce con scatter_index), la traza en vivo se
+# diezma por mín/máx, la campana pasa de un punto por muestra a histograma
+# por encima de DEV_SCATTER_MAX y las barras se agrupan (máximo del grupo)
+# por encima de MAX_BARS. La campana y la traza van
+# animadas sobre límites escalonados: seleccionar o sumar muestras es un
+# blit, el dibujo completo queda para cuando cambian los límites.
+class CalibrationPlots:
+    SCATTER_MAX = 2000
+    SCATTER_GRID = (600, 400)
+    TRACE_MAX_POINTS = 2000
+    DEV_SCATTER_MAX = 1000
+    HIST_BINS = 60
+    MAX_BARS = 150
+
+    def __init__(self, fig, canvas):
+        self.fig, self.canvas = fig, canvas
+        self.ax_scatter, self.ax_dev, self.ax_bar = fig.subplots(3, 1)
+        fig.tight_layout(pad=3)
+
+        # ── Scatter + linealización ─────────────────────────────────────────
+        ax = self.ax_scatter
+        self.scatter = ax.scatter(np.empty(0), np.empty(0), c='C0', s=60,
+                                  picker=5, edgecolor='k', zorder=3,
+                                  label="Mediciones")
+        self._fit_line, = ax.plot([], [], zorder=2)
+        self._offset_sc = ax.scatter(np.empty(0), np.empty(0), c='m', s=120,
+                                     marker='X', label="Offset", zorder=4)
+        self._legend_key = None
+        ax.set_xlabel("Flujo de referencia (slm)")
+        ax.set_ylabel("Voltaje (V)")
+
+        # ── Campana de desviaciones ─────────────────────────────────────────
+        ax = self.ax_dev
+        self._pdf_line, = ax.plot([], [], color='C0', zorder=2, animated=True)
+        self._dev_sc = ax.scatter(np.empty(0), np.empty(0), color='C0', s=30,
+                                  alpha=0.6, zorder=3, animated=True)
+        self._worst_sc = ax.scatter(np.empty(0), np.empty(0), color='r',
+                                    edgecolor='k', s=80, zorder=4, animated=True)
+        self._worst_txt = ax.text(0, 0, "", ha="center", va="bottom", color='r',
+                                  animated=True)
+        self._dev_hist = ax.stairs(np.zeros(1), [0.0, 1.0], fill=True, color='C0',
+                                   alpha=0.4, zorder=1, visible=False, animated=True)
+        # título propio y animado: cambia con cada selección y cada muestra
+        self._dev_title = ax.text(0.5, 1.01, "", transform=ax.transAxes, ha='center',
+                                  va='bottom', animated=True)
+        self._dev_lim = 0.0   # semiancho del eje x de la campana, en V
+        # durante una corrida: traza muestra a muestra respecto de la media
+        # en curso, banda ±σ y banda ±2σ de la media
+        self._live_band = Rectangle((0, 0), 0, 0, facecolor='C0', alpha=0.15,
+                                    zorder=1, visible=False)
+        self._live_sem = Rectangle((0, 0), 0, 0, facecolor='C1', alpha=0.4,
+                                   zorder=2, visible=False)
+        ax.add_patch(self._live_band); ax.add_patch(self._live_sem)
+        self._live_line, = ax.plot([], [], color='C0', lw=1, zorder=3, visible=False)
+        for a in (self._live_band, self._live_sem, self._live_line):
+            a.set_animated(True)
+        self._live_xmax = 10   # límites escalonados de la traza
+        self._live_ylim = 0.0
+        self._live_peak = 0.0  # mayor semiancho pedido en la corrida
+        self._live_on = None
+        self._show_live(False)
+
+        # ── Barra peor desviación relativa ──────────────────────────────────
+        ax = self.ax_bar
+        self._bars = []
+        self._bar_group = 1   # experimentos por barra
+        ax.xaxis.set_major_locator(MaxNLocator(integer=True))
+        ax.set_xlabel("Experimento")
+        ax.set_ylabel("Máx desviación (%)")
+        ax.set_title("Peor desviación relativa")
+
+        # ── Resaltado de selección (animado → blitting) ─────────────────────
+        self._sel_sc = self.ax_scatter.scatter(np.empty(0), np.empty(0), c='r',
+                                               s=100, edgecolor='k', zorder=5,
+                                               animated=True)
+        self._sel_bar = Rectangle((0, 0), 0.8, 0, facecolor='r', edgecolor='k',
+                                  zorder=4, animated=True, visible=False)
+        self.ax_bar.add_patch(self._sel_bar)
+        self._bg = None
+        canvas.mpl_connect('draw_event', self._on_draw)
+
+        self._refs = np.empty(0)
+        self._volts = np.empty(0)
+        self._worst = np.empty(0)
+        self._shown = None   # índices dibujados en el scatter (None = todos)
+
+    # ── API ──────────────────────────────────────────────────────────────
+    @timed("graficas.update")
+    def update(self, store, offset, selected, fit=None):
+        # columnas cacheadas del ExperimentStore, sin recalcular nada
+        self._refs = store.column('ref')
+        self._volts = store.column('voltAvg')
+        self._worst = store.column('worst')
+        self._update_scatter(offset, fit)
+        self._update_bars()
+        self._update_dev(store, selected)
+        self._update_selection(selected)
+        self.canvas.draw_idle()
+
+    @timed("graficas.vivo")
+    def live(self, values, mean, std, sem):
+        # corrida en curso (values en V); la campana vuelve con update().
+        # La traza va por blit; el dibujo completo solo al entrar o cuando
+        # cambian los límites: x crece al doble y y solo se agranda durante
+        # la corrida. Se arranca con los de la corrida anterior (y se achica
+        # ahí si aquella quedó holgada), así una corrida típica redibuja una vez.
+        entering = self._show_live(True)
+        if entering:
+            if 4*self._live_peak < self._live_ylim:
+                self._live_ylim = 1.5*self._live_peak
+            self._live_peak = 0.0
+        ax = self.ax_dev
+        n = len(values)
+        dev = np.asarray(values) - mean
+        self._live_line.set_data(*minmax_decimate(dev, self.TRACE_MAX_POINTS))
+        sem = sem if np.isfinite(sem) else 0.0
+        self._live_band.set_bounds(0.5, -std, n, 2*std)
+        self._live_sem.set_bounds(0.5, -2*sem, n, 4*sem)
+        self._dev_title.set_text(f"n = {n}   media = {mean:.4f} V   σ = {std:.4f} V   σ media = {sem:.5f} V")
+        need = 1.1*max(abs(dev).max(initial=0.0), 2*std) or 1e-3
+        self._live_peak = max(self._live_peak, need)
+        redraw = entering or self._bg is None
+        if n > self._live_xmax:
+            self._live_xmax = 1 << (n-1).bit_length()
+            redraw = True
+        if need > self._live_ylim:
+            self._live_ylim = 1.5*need
+            redraw = True
+        if redraw:
+            ax.set_xlim(0.5, self._live_xmax+0.5)
+            ax.set_ylim(-self._live_ylim, self._live_ylim)
+            self.canvas.draw_idle()
+        else:
+            self._blit()
+
+    @timed("graficas.seleccion")
+    def select(self, store, selected):
+        # resaltado y campana son animados: alcanza con un blit salvo que
+        # cambien los límites de la campana
+        self._update_selection(selected)
+        if self._update_dev(store, selected) or self._bg is None:
+            self.canvas.draw_idle()
+        else:
+            self._blit()
+
+    def scatter_index(self, ind):
+        # índice del pick en el scatter → índice de experimento
+        return int(ind) if self._shown is None else int(self._shown[ind])
+
+    # ── Paneles ──────────────────────────────────────────────────────────
+    def _update_scatter(self, offset, fit):
+        ax = self.ax_scatter
+        refs, volts = self._refs, self._volts
+        pts = np.column_stack([refs, volts])
+        self._shown = None
+        if len(pts) > self.SCATTER_MAX:
+            # los puntos que caen en la misma celda se tapan entre sí
+            self._shown = grid_thin(pts, self.SCATTER_GRID)
+            pts = pts[self._shown]
+        self.scatter.set_offsets(pts)
+        self._offset_sc.set_offsets(np.empty((0, 2)) if offset is None else [[0.0, offset]])
+
+        # el ajuste (m, b, R²) viene del modelo de calibración; el offset
+        # cuenta como punto (0, offset)
+        if offset is not None:
+            refs = np.append(refs, 0.0)
+            volts = np.append(volts, offset)
+        fit_label = None
+        if fit is not None and refs.size > 1:
+            m, b, r2 = fit
+            xs = np.linspace(refs.min(), refs.max(), 100)
+            self._fit_line.set_data(xs, m*xs+b)
+            fit_label = f"y={m:.3f}x+{b:.3f}, R²={r2:.3f}"
+        else:
+            self._fit_line.set_data([], [])
+        self._fit_line.set_label(fit_label or "_nolegend_")
+
+        ax.set_title("" if refs.size else "Sin datos")
+        key = (bool(self._refs.size), fit_label, offset is not None)
+        if key != self._legend_key:
+            self._legend_key = key
+            handles = [h for h, show in ((self.scatter, key[0]),
+                                         (self._fit_line, fit_label),
+                                         (self._offset_sc, key[2])) if show]
+            if handles:
+                ax.legend(handles=handles)
+            elif ax.get_legend():
+                ax.get_legend().remove()
+
+        ax.relim()
+        if refs.size:
+            ax.update_datalim(np.column_stack([refs, volts]))
+        ax.autoscale_view()
+
+    def _update_bars(self):
+        # una barra por experimento hasta MAX_BARS; después cada barra es el
+        # peor de un grupo consecutivo y el eje sigue en números de experimento
+        ax, bars = self.ax_bar, self._bars
+        g = self._bar_group = max(1, -(-len(self._worst)//self.MAX_BARS))
+        worst = group_max(self._worst, g)
+        while len(bars) > len(worst):
+            bars.pop().remove()
+        for i in range(len(bars), len(worst)):
+            r = Rectangle((0, 0), 0.8, 0, facecolor='C0', edgecolor='k', zorder=3)
+            r.sticky_edges.y.append(0)
+            bars.append(ax.add_patch(r))
+        lw = 1.0 if g == 1 else 0.3
+        for i, (r, h) in enumerate(zip(bars, worst)):
+            r.set_bounds(i*g+1-0.4, 0, g-0.2, h)
+            r.set_linewidth(lw)
+        ax.relim()
+        ax.autoscale_view()
+
+    def _show_live(self, on):
+        # True si cambió de modo
+        if on == self._live_on:
+            return False
+        self._live_on = on
+        for a in (self._live_line, self._live_band, self._live_sem):
+            a.set_visible(on)
+        for a in (self._pdf_line, self._dev_sc, self._worst_sc, self._worst_txt):
+            a.set_visible(not on)
+        ax = self.ax_dev
+        if on:
+            self._dev_hist.set_visible(False)
+        else:
+            self._dev_lim = 0.0   # la traza movió los límites: se recalculan
+            ax.set_ylim(-0.05, 1.2)
+        ax.set_xlabel("Muestra" if on else "Desviación (V)")
+        ax.set_ylabel("Desviación (V)" if on else "Densidad relativa")
+        return True
+
+    def _update_dev(self, store, selected):
+        # el eje x va por escalones como la traza en vivo: mientras la
+        # desviación entre en (lim/2, lim] cambiar de experimento solo mueve
+        # artistas animados (también la campana). True si hay que redibujar todo.
+        ax = self.ax_dev
+        redraw = self._show_live(False)
+        if not (len(store) and selected):
+            self._pdf_line.set_data([], [])
+            for sc in (self._dev_sc, self._worst_sc):
+                sc.set_offsets(np.empty((0, 2)))
+            self._dev_hist.set_visible(False)
+            self._worst_txt.set_text("")
+            self._dev_title.set_text("")
+            return redraw
+        idx = selected[0]
+        data = store.samples(idx)
+        mu, std = self._volts[idx], store.column('std')[idx]
+        dev = data-mu
+        std = std or np.finfo(float).eps
+        need = max(4*std, abs(dev).max())
+        if not self._dev_lim/2 < need <= self._dev_lim:
+            self._dev_lim = 1.25*need
+            ax.set_xlim(-1.05*self._dev_lim, 1.05*self._dev_lim)
+            redraw = True
+        lim = self._dev_lim
+        x = np.linspace(-lim, lim, 300)
+        self._pdf_line.set_data(x, np.exp(-0.5*(x/std)**2))
+        many = len(dev) > self.DEV_SCATTER_MAX
+        if many:
+            # histograma normalizado al pico, en la misma escala que la campana
+            counts, edges = np.histogram(dev, bins=self.HIST_BINS, range=(-lim, lim))
+            self._dev_hist.set_data(counts/max(counts.max(), 1), edges)
+            self._dev_sc.set_offsets(np.empty((0, 2)))
+        else:
+            self._dev_sc.set_offsets(np.column_stack([dev, np.exp(-0.5*(dev/std)**2)]))
+        self._dev_hist.set_visible(many)
+        self._dev_sc.set_visible(not many)
+        ki = np.argmax(abs(dev))
+        wd = dev[ki]
+        wp = np.exp(-0.5*(wd/std)**2)
+        self._worst_sc.set_offsets([[wd, wp]])
+        self._worst_txt.set_position((wd, wp+0.05))
+        self._worst_txt.set_text(f"{data[ki]:.2f}")
+        self._dev_title.set_text(f"Prom dev = {mu:.2f} V   σ = {std:.2f} V")
+        return redraw
+
+    def _update_selection(self, selected):
+        # índices como array: se resaltan todos de una vez, sin recorrer puntos
+        sel = np.unique(np.asarray(selected, dtype=np.intp))
+        sel = sel[(sel >= 0) & (sel < len(self._refs))]
+        if not sel.size:
+            self._sel_sc.set_offsets(np.empty((0, 2)))
+            self._sel_bar.set_visible(False)
+            return
+        self._sel_sc.set_offsets(np.column_stack([self._refs[sel], self._volts[sel]]))
+        # la barra resaltada es la del grupo del primer seleccionado
+        idx = int(selected[0]) if 0 <= selected[0] < len(self._refs) else int(sel[0])
+        g = self._bar_group
+        start = idx//g*g
+        # con barras agrupadas la altura es la del grupo, como la barra dibujada
+        self._sel_bar.set_bounds(start+1-0.4, 0, g-0.2, self._worst[start:start+g].max())
+        self._sel_bar.set_visible(True)
+
+    # ── Blitting ─────────────────────────────────────────────────────────
+    def _on_draw(self, event):
+        self._bg = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self):
+        # draw_artist no pinta los que están ocultos
+        for a in (self._sel_sc, self._sel_bar, self._dev_hist, self._pdf_line, self._dev_sc,
+                  self._worst_sc, self._worst_txt, self._live_band, self._live_sem,
+                  self._live_line, self._dev_title):
+            self.fig.draw_artist(a)
+
+    def _blit(self):
+        if self._bg is None:
+            return
+        self.canvas.restore_region(self._bg)
+        self._draw_animated()
+        self.canvas.blit(self.fig.bbox)
+
+
+# Vista comparada de varios equipos del banco: puntos y recta de cada uno en
+# el mismo eje y, abajo, el residuo de cada punto contra su propia recta.
+# Los artistas se crean una vez por equipo y después se actualizan en sitio.
+class ComparisonPlots:
+    def __init__(self, fig, canvas):
+        self.fig, self.canvas = fig, canvas
+        self.ax_fit, self.ax_res = fig.subplots(2, 1, sharex=True)
+        self._artists = {}   # nombre → (scatter, recta, residuos)
+        self._legend_key = None
+        self.ax_fit.set_ylabel("Voltaje (V)")
+        self.ax_fit.set_title("Linealización por equipo")
+        self.ax_res.axhline(0, color='k', lw=0.8)
+        self.ax_res.set_xlabel("Flujo de referencia (slm)")
+        self.ax_res.set_ylabel("Residuo (V)")
+        fig.tight_layout(pad=3)
+
+    def update(self, items):
+        # items: [(nombre, sesión, ajuste (m, b, R²) o None)]
+        names = set()
+        for name, session, fit in items:
+            names.add(name)
+            art = self._artists.get(name)
+            if art is None:
+                color = f"C{len(self._artists) % 10}"
+                art = self._artists[name] = (
+                    self.ax_fit.scatter(np.empty(0), np.empty(0), color=color, s=30,
+                                        edgecolor='k', zorder=3),
+                    self.ax_fit.plot([], [], color=color, zorder=2)[0],
+                    self.ax_res.plot([], [], 'o-', color=color, ms=4)[0])
+            sc, line, res = art
+            refs, volts = session.fit_points()
+            sc.set_offsets(np.column_stack([refs, volts]))
+            label = name
+            if fit is not None and refs.size > 1:
+                m, b, r2 = fit
+                xs = np.array([refs.min(), refs.max()])
+                line.set_data(xs, m*xs + b)
+                order = np.argsort(refs)
+                res.set_data(refs[order], (volts - (m*refs + b))[order])
+                label = f"{name}: y={m:.3f}x+{b:.3f}, R²={r2:.3f}"
+            else:
+                line.set_data([], [])
+                res.set_data([], [])
+            line.set_label(label)
+        for name in set(self._artists) - names:   # equipos desconectados
+            for a in self._artists.pop(name):
+                a.remove()
+
+        key = tuple(a[1].get_label() for a in self._artists.values())
+        if key != self._legend_key:
+            self._legend_key = key
+            if key:
+                self.ax_fit.legend(handles=[a[1] for a in self._artists.values()], fontsize=8)
+            elif self.ax_fit.get_legend():
+                self.ax_fit.get_legend().remove()
+        self.ax_fit.relim(); self.ax_res.relim()
+        # relim no ve las colecciones: los puntos se suman a mano
+        for sc, _, _ in self._artists.values():
+            pts = sc.get_offsets()
+            if len(pts):
+                self.ax_fit.update_datalim(pts)
+        self.ax_fit.autoscale_view(); self.ax_res.autoscale_view()
+        self.canvas.draw_idle()
@@ -0,0 +1,151 @@
+import csv
+import functools
+import json
+import math
+import os
+import time
+from array import array
+
+# Instrumentación de rendimiento, apagada por defecto: con FCAL_PERF=1 en el
+# entorno se registra cuánto tarda cada etapa (lectura del puerto, parseo,
+# espera en la cola, estadística, gráficas, reporte) en histogramas de
+# tamaño fijo. Apagada, PERF es None y timed() devuelve la función sin
+# envolver; en los lazos queda un solo `if perf:` por bloque leído.
+ENABLED = os.environ.get("FCAL_PERF", "0") not in ("", "0")
+
+PER_DECADE = 10
+DECADES = 8                          # lo .. lo·10⁸ (1 µs .. 100 s en tiempos)
+N_BINS = PER_DECADE*DECADES + 2      # + bajo rango y sobre rango
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+# Histograma en bins logarítmicos (10 por década) sobre un array('Q') fijo:
+# agregar un valor no crea objetos. Los cuantiles salen del borde superior
+# del bin, con ~26 % de resolución, acotados por el máximo visto.
+class Histogram:
+    __slots__ = ('lo', 'unit', 'counts', 'n', 'total', 'max')
+
+    def __init__(self, lo=1e-6, unit='s'):
+        self.lo, self.unit = lo, unit
+        self.counts = array('Q', bytes(8*N_BINS))
+        self.reset()
+
+    def reset(self):
+        self.counts[:] = array('Q', bytes(8*N_BINS))
+        self.n = 0
+        self.total = self.max = 0.0
+
+    def add(self, v, k=1):
+        # k: el mismo valor para k eventos (p. ej. un bloque leído)
+        if v <= self.lo:
+            i = 0
+        else:
+            i = min(int(math.log10(v/self.lo)*PER_DECADE) + 1, N_BINS - 1)
+        self.counts[i] += k
+        self.n += k
+        self.total += v*k
+        if v > self.max:
+            self.max = v
+
+    def edges(self):
+        # borde superior de cada bin; el último es sobre rango
+        return [self.lo*10**(i/PER_DECADE) for i in range(N_BINS - 1)] + [math.inf]
+
+    def quantile(self, q):
+        if not self.n:
+            return 0.0
+        target, acc = q*self.n, 0
+        for i, c in enumerate(self.counts):
+            acc += c
+            if c and acc >= target:
+                return min(self.lo*10**(i/PER_DECADE), self.max)
+        return self.max
+
+    def summary(self):
+        out = {'n': self.n, 'unidad': self.unit,
+               'media': self.total/self.n if self.n else 0.0, 'max': self.max}
+        for q in QUANTILES:
+            out[f"p{round(q*100)}"] = self.quantile(q)
+        return out
+
+
+class Instruments:
+    def __init__(self):
+        self.hist = {}
+        self.counters = {}
+        self._watch = {}
+        self.t_start = time.time()
+
+    def histogram(self, name, lo=1e-6, unit='s'):
+        h = self.hist.get(name)
+        if h is None:
+            h = self.hist[name] = Histogram(lo, unit)
+        return h
+
+    def add(self, name, v, k=1):
+        self.histogram(name).add(v, k)
+
+    def count(self, name, k=1):
+        self.counters[name] = self.counters.get(name, 0) + k
+
+    def watch(self, name, fn):
+        # contador que vive en otro lado (p. ej. parser.unparsed): se lee al exportar
+        self._watch[name] = fn
+
+    def reset(self):
+        for h in self.hist.values():
+            h.reset()
+        self.counters.clear()
+        self.t_start = time.time()
+
+    def totals(self):
+        out = dict(self.counters)
+        for name, fn in self._watch.items():
+            out[name] = fn()
+        return out
+
+    def report(self):
+        return {'inicio': self.t_start, 'duracion_s': time.time() - self.t_start,
+                'contadores': self.totals(),
+                'histogramas': {name: dict(h.summary(), bordes=h.edges()[:-1], cuentas=list(h.counts))
+                                for name, h in sorted(self.hist.items())}}
+
+    def to_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=1, ensure_ascii=False)
+
+    def to_csv(self, path):
+        # una fila por etapa con el resumen, después los contadores
+        cols = ['n', 'unidad', 'media', 'max'] + [f"p{round(q*100)}" for q in QUANTILES]
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(['etapa'] + cols)
+            for name, h in sorted(self.hist.items()):
+                s = h.summary()
+                w.writerow([name] + [s[c] for c in cols])
+            w.writerow([])
+            w.writerow(['contador', 'valor'])
+            for name, v in sorted(self.totals().items()):
+                w.writerow([name, v])
+
+
+PERF = Instruments() if ENABLED else None
+
+
+def timed(name):
+    # decorador de etapa; sin instrumentación devuelve la función tal cual
+    def deco(fn):
+        if PERF is None:
+            return fn
+        add = PERF.histogram(name).add
+        clock = time.perf_counter
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = clock()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                add(clock() - t0)
+        return wrapper
+    return deco
@@ -1,18 +1,24 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import serial
-import numpy as np
 import time
-import re
-import io
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas as pdfcanvas
-from reportlab.lib.units import cm
-from reportlab.lib.utils import ImageReader
 
+from consola import SerialConsole
+from barrido import SweepScheduler, parse_points
+from instrumentacion import PERF, timed
+
+# Arranque en dos etapas: acá solo Tk y módulos livianos, así la ventana
+# aparece enseguida. numpy, matplotlib, pyserial y reportlab se importan
+# donde se usan; las gráficas y la sesión se arman en _late_init, después
+# del primer pintado (benchmarks/bench_arranque.py vigila que siga así).
 class FlowCalibrationApp:
+    POLL_MS = 50        # periodo de drenado de la cola serie
+    RUN_TIMEOUT = 60.0  # s sin resumen → se aborta la corrida
+    SKETCH_SAMPLES = 100  # N_MUESTRAS del sketch: con periodo largo la corrida dura más
+    CONSOLE_MAX_LINES = 5000
+    EARLY_STOP_MIN = 10 # muestras mínimas antes de cortar (MIN_MUESTRAS del sketch)
+    VELOCITY_TO_FLOW = 7.6  # constante de proporcionalidad m/s → slm
+    SWEEP_RETRIES = 2   # reintentos por punto del barrido tras un timeout
+
     def __init__(self, master):
         self.master = master
         master.title("Calibración de Flujómetro")
@@ -30,11 +36,34 @@ class FlowCalibrationApp:
         control = ttk.Frame(master, padding=20, style="TFrame")
         control.pack(side=tk.LEFT, fill=tk.Y)
 
-        ttk.Label(control, text="Puerto serie (ej. COM3 / /dev/ttyUSB0):", style="Header.TLabel").pack(anchor=tk.W)
+        ttk.Label(control, text="Puerto(s) serie (ej. COM3, COM4 / /dev/ttyUSB0):", style="Header.TLabel").pack(anchor=tk.W)
         self.port_entry = ttk.Entry(control); self.port_entry.insert(0, "COM3")
         self.port_entry.pack(fill=tk.X, pady=(0,10))
         ttk.Button(control, text="Conectar", command=self.connect_serial).pack(fill=tk.X, pady=(0,10))
 
+        # varios equipos: todos reciben la misma referencia, se ve uno a la vez
+        dev_row = ttk.Frame(control, style="TFrame")
+        dev_row.pack(fill=tk.X, pady=(0,10))
+        ttk.Label(dev_row, text="Equipo:").pack(side=tk.LEFT)
+        self.device_var = tk.StringVar(value="")
+        self.device_cb = ttk.Combobox(dev_row, textvariable=self.device_var, state="readonly", width=12)
+        self.device_cb.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(5,5))
+        self.device_cb.bind("<<ComboboxSelected>>", self.select_device)
+        ttk.Button(dev_row, text="Comparar", command=self.show_compare).pack(side=tk.RIGHT)
+
+        # modo binario: el sketch manda cuentas ADC en tramas a más baud
+        bin_row = ttk.Frame(control, style="TFrame")
+        bin_row.pack(fill=tk.X, pady=(0,10))
+        self.binary_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(bin_row, text="Binario", variable=self.binary_var,
+                        command=self.toggle_binary).pack(side=tk.LEFT)
+        self.baud_var = tk.StringVar(value="115200")
+        ttk.Combobox(bin_row, textvariable=self.baud_var, width=8,
+                     values=["57600","115200","250000","500000","1000000"]).pack(side=tk.LEFT, padx=(5,0))
+        ttk.Label(bin_row, text="ms:").pack(side=tk.LEFT, padx=(5,0))
+        self.period_var = tk.StringVar(value="10")
+        ttk.Entry(bin_row, textvariable=self.period_var, width=4).pack(side=tk.LEFT)
+
         ttk.Label(control, text="Velocidad patrón (m/s):", style="Header.TLabel").pack(anchor=tk.W)
         self.velocity_entry = ttk.Entry(control)
         self.velocity_entry.pack(fill=tk.X, pady=(0,10))
@@ -43,12 +72,59 @@ class FlowCalibrationApp:
         self.precision_var = tk.StringVar(value="n/a")
         ttk.Entry(control, textvariable=self.precision_var, state="readonly").pack(fill=tk.X, pady=(0,10))
 
+        ttk.Label(control, text="Ajuste lineal:", style="Header.TLabel").pack(anchor=tk.W)
+        self.fit_mode_var = tk.StringVar(value="ordinario")
+        # los modos (calibracion → numpy) se cargan en _late_init
+        self.fit_cb = fit_cb = ttk.Combobox(control, textvariable=self.fit_mode_var,
+                                            values=["ordinario"], state="readonly")
+        fit_cb.pack(fill=tk.X, pady=(0,10))
+        fit_cb.bind("<<ComboboxSelected>>", lambda _e: self.update_plots())
+
+        # parada anticipada: se manda "s" cuando σ de la media < tolerancia
+        stop_row = ttk.Frame(control, style="TFrame")
+        stop_row.pack(fill=tk.X, pady=(0,10))
+        self.early_stop_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(stop_row, text="Parar si σ media <", variable=self.early_stop_var).pack(side=tk.LEFT)
+        self.tol_var = tk.StringVar(value="0.001")
+        ttk.Entry(stop_row, textvariable=self.tol_var, width=7).pack(side=tk.LEFT, padx=(5,0))
+        ttk.Label(stop_row, text="V").pack(side=tk.LEFT)
+
         self.take_btn = ttk.Button(control, text="Tomar medida", command=self.take_measurement)
         self.take_btn.pack(fill=tk.X, pady=(0,10))
 
+        # barrido automático: offset primero y después cada velocidad
+        ttk.Label(control, text="Barrido (m/s, ej. 1, 2:10:2):", style="Header.TLabel").pack(anchor=tk.W)
+        self.sweep_points_var = tk.StringVar(value="")
+        ttk.Entry(control, textvariable=self.sweep_points_var).pack(fill=tk.X)
+        sweep_row = ttk.Frame(control, style="TFrame")
+        sweep_row.pack(fill=tk.X, pady=(2,0))
+        ttk.Label(sweep_row, text="Rep.").pack(side=tk.LEFT)
+        self.sweep_repeats_var = tk.StringVar(value="1")
+        ttk.Spinbox(sweep_row, from_=1, to=20, textvariable=self.sweep_repeats_var, width=3).pack(side=tk.LEFT, padx=(2,8))
+        ttk.Label(sweep_row, text="Asentar (s)").pack(side=tk.LEFT)
+        self.sweep_settle_var = tk.StringVar(value="0")
+        ttk.Entry(sweep_row, textvariable=self.sweep_settle_var, width=5).pack(side=tk.LEFT, padx=(2,0))
+        self.sweep_btn = ttk.Button(control, text="Iniciar barrido", command=self.start_sweep)
+        self.sweep_btn.pack(fill=tk.X, pady=(5,0))
+        self.sweep_status_var = tk.StringVar(value="")
+        ttk.Label(control, textvariable=self.sweep_status_var).pack(anchor=tk.W, pady=(0,10))
+
         ttk.Button(control, text="Exportar datos (.txt)", command=self.export_data).pack(fill=tk.X, pady=(0,5))
         ttk.Button(control, text="Generar reporte (.pdf)", command=self.generate_report).pack(fill=tk.X, pady=(0,5))
+        ttk.Button(control, text="Guardar sesión (.cal)", command=self.save_session).pack(fill=tk.X, pady=(0,5))
+        ttk.Button(control, text="Abrir sesión (.cal)", command=self.load_session).pack(fill=tk.X, pady=(0,5))
         ttk.Button(control, text="Reiniciar", command=self.reset_all).pack(fill=tk.X)
+        if PERF:   # solo con FCAL_PERF=1
+            ttk.Button(control, text="Diagnóstico", command=self.show_diagnostics).pack(fill=tk.X, pady=(5,0))
+
+        # progreso del reporte PDF (se arma en un hilo aparte)
+        report_row = ttk.Frame(control, style="TFrame")
+        report_row.pack(fill=tk.X, pady=(5,0))
+        self.report_bar = ttk.Progressbar(report_row, maximum=1.0)
+        self.report_bar.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.report_cancel_btn = ttk.Button(report_row, text="Cancelar", state='disabled',
+                                            command=lambda: self._report and self._report.cancel())
+        self.report_cancel_btn.pack(side=tk.RIGHT, padx=(5,0))
 
         ttk.Label(control, text="Datos resumen:", style="Header.TLabel").pack(anchor=tk.W, pady=(10,0))
         self.info_var = tk.StringVar(value="")
@@ -58,124 +134,277 @@ class FlowCalibrationApp:
         right = ttk.Frame(master, style="TFrame")
         right.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
 
-        self.fig, (self.ax_scatter, self.ax_dev, self.ax_bar) = plt.subplots(3,1,figsize=(6,9))
-        self.fig.tight_layout(pad=3)
-        self.canvas = FigureCanvasTkAgg(self.fig, master=right)
-        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-        self.canvas.mpl_connect('pick_event', self.on_pick)
+        # lugar de las gráficas hasta que _late_init cree figura y canvas
+        self.plot_frame = ttk.Frame(right, style="TFrame")
+        self.plot_frame.pack(fill=tk.BOTH, expand=True)
+        self._loading = ttk.Label(self.plot_frame, text="Cargando gráficas…")
+        self._loading.pack(expand=True)
+        self.fig = self.canvas = self.plots = None
 
-        console_frame = ttk.Frame(right, style="TFrame")
-        console_frame.pack(fill=tk.BOTH, pady=(10,0))
-        self.console_text = tk.Text(console_frame, height=8, state='disabled', bg="#e8e8e8", font=("Consolas",10))
-        sb = ttk.Scrollbar(console_frame, orient='vertical', command=self.console_text.yview)
-        self.console_text['yscrollcommand'] = sb.set
-        self.console_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        sb.pack(side=tk.RIGHT, fill=tk.Y)
+        self.console = SerialConsole(right, max_lines=self.CONSOLE_MAX_LINES)
+        self.console.pack(fill=tk.BOTH, pady=(10,0))
 
         # ── Resolución ─────────────────────────────────────────────────────
         self.res_label = ttk.Label(master, text="Resolución sensor: 5 V / 1024", style="Header.TLabel")
         self.res_label.place(relx=1.0, rely=1.0, x=-10, y=-10, anchor="se")
 
         # datos internos
-        self.experiments = []
+        self.devices = []
+        self.dev = None                      # equipo que se muestra
+        self._offline = None                 # sesión sin puertos abiertos (_late_init)
+        self._detached = {}                  # sesiones con datos de puertos que ya no están
         self.selected = []
-        self.ser = None
-        self.offset = None
+        self._pending = set()                # equipos que faltan en el punto actual
+        self._run_limit = self.RUN_TIMEOUT   # s; crece con el periodo del modo binario
+        self._sweep = None
+        self._compare = None
+        self._report = None
+        self._diag = None
+        if PERF:
+            PERF.watch("parser.sin_parsear", lambda: sum(d.reader.parser.unparsed for d in self.devices))
+            PERF.watch("parser.tramas_perdidas", lambda: sum(d.reader.parser.dropped for d in self.devices))
+            PERF.watch("cola.pendientes", lambda: sum(len(d.reader.events) for d in self.devices))
+
+        # after_idle corre después de los pendientes de Tk (geometría y
+        # pintado); el after(1) deja pasar los eventos de exposición
+        self.master.after_idle(lambda: self.master.after(1, self._late_init))
+
+    @timed("ui.arranque")
+    def _late_init(self):
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
+        from calibracion import MODES
+        from graficas import CalibrationPlots
+        from sesion import CalibrationSession
+
+        self.fit_cb.config(values=list(MODES))
+        self._offline = CalibrationSession()
+        self._loading.destroy()
+        self.fig = Figure(figsize=(6,9))
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self.plot_frame)
+        self.plots = CalibrationPlots(self.fig, self.canvas)
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.canvas.mpl_connect('pick_event', self.on_pick)
+        if PERF:
+            self.canvas.draw = timed("graficas.canvas.draw")(self.canvas.draw)
+        self.master.after(self.POLL_MS, self.read_serial)
 
-        self.master.after(100, self.read_serial)
+    # sesión del equipo que se está mostrando (sin puertos: la de trabajo offline)
+    @property
+    def session(self):
+        return self.dev.session if self.dev is not None else self._offline
 
     def connect_serial(self):
-        port = self.port_entry.get().strip()
-        if self.ser:
-            try: self.ser.close()
-            except: pass
-        try:
-            self.ser = serial.Serial(port, baudrate=9600, timeout=0.1)
-            messagebox.showinfo("Puerto conectado", f"Conectado a {port}")
-        except Exception as e:
-            messagebox.showwarning("No conectado", f"No se pudo abrir {port}:\n{e}\nModo test activo.")
-            self.ser = None
+        # con corridas o un barrido en curso los equipos viejos quedarían en
+        # _pending y nadie los destraba: primero hay que terminar o detener
+        if self._busy() or self._pending or self._sweep is not None:
+            messagebox.showwarning("Conectar", "Esperar a que termine la corrida o detener el barrido")
+            return
+        import serial
+        from dispositivo import Device
+        ports = [p.strip() for p in self.port_entry.get().split(",") if p.strip()]
+        # las sesiones siguen con su puerto; un puerto nuevo adopta en orden
+        # las que quedaron sin el suyo (la offline, o COM3 que volvió como COM4)
+        shown = self.session
+        keep = {}
+        if not self.devices and self._offline is not None:
+            keep["offline"] = self._offline
+        keep.update((d.name, d.session) for d in self.devices)
+        for n, ses in self._detached.items():
+            keep.setdefault(n, ses)
+        orphans = [n for n in keep if n not in ports]
+        for d in self.devices:
+            d.stop()
+        self.devices, self.dev = [], None
+        failed = []
+        for port in ports:
+            try:
+                ser = serial.Serial(port, baudrate=9600, timeout=0.1)
+            except Exception as e:
+                failed.append(f"{port}: {e}")
+                continue
+            name = port if port in keep else (orphans.pop(0) if orphans else None)
+            self.devices.append(Device(ser, port, keep.pop(name, None)).start())
+        if not self.devices and shown is not None:
+            keep = {n: ses for n, ses in keep.items() if ses is not shown}
+        # lo que no encontró puerto se guarda hasta que vuelva a conectarse
+        self._detached = {n: ses for n, ses in keep.items()
+                          if len(ses.experiments) or ses.offset is not None}
+        self.binary_var.set(False)   # la placa se reinicia al abrir el puerto
+        self._run_limit = self.RUN_TIMEOUT
+        names = [d.name for d in self.devices]
+        self.device_cb.config(values=names)
+        self.device_var.set(names[0] if names else "")
+        self.dev = self.devices[0] if self.devices else None
+        if self.dev is None:
+            self._offline = shown
+        self.selected = []; self.info_var.set("")
+        self.update_plots()
+        if failed:
+            messagebox.showwarning("No conectado", "No se pudo abrir:\n" + "\n".join(failed)
+                                   + ("" if names else "\nModo test activo."))
+        if self._detached:
+            messagebox.showwarning("Sesiones sin puerto",
+                                   "Quedan guardadas hasta volver a conectar el puerto:\n"
+                                   + "\n".join(f"{n}: {len(ses.experiments)} corridas"
+                                                for n, ses in self._detached.items()))
+        if names:
+            messagebox.showinfo("Puerto conectado", f"Conectado a {', '.join(names)}")
+
+    def select_device(self, _event=None):
+        name = self.device_var.get()
+        dev = next((d for d in self.devices if d.name == name), None)
+        if dev is None or dev is self.dev: return
+        self.dev = dev
+        self.selected = []; self.info_var.set("")
+        self.update_plots()
+
+    def _connected(self):
+        return bool(self.devices) and all(d.alive for d in self.devices)
+
+    def _busy(self):
+        return any(d.busy for d in self.devices)
+
+    def toggle_binary(self):
+        if not self._connected() or self._busy():
+            self.binary_var.set(not self.binary_var.get())
+            messagebox.showwarning("Modo binario", "Conectar el puerto y esperar a que termine la corrida")
+            return
+        if self.binary_var.get():
+            try:
+                baud, period = int(self.baud_var.get()), int(self.period_var.get())
+                # el sketch hace delay(periodo) sin signo y lo guarda en un int de 16 bits
+                if baud <= 0 or not 0 < period <= 32767:
+                    raise ValueError
+            except ValueError:
+                self.binary_var.set(False)
+                messagebox.showerror("Modo binario", "Baud o periodo inválido")
+                return
+            cmd = f"b{baud},{period}\n".encode()
+            # la corrida completa tarda SKETCH_SAMPLES·periodo: margen del doble
+            self._run_limit = max(self.RUN_TIMEOUT, 2*self.SKETCH_SAMPLES*period/1000)
+        else:
+            cmd = b"t\n"
+            self._run_limit = self.RUN_TIMEOUT
+        # el hilo lector de cada equipo cambia el baud al leer la confirmación
+        for d in self.devices:
+            d.reader.write(cmd)
 
     def take_measurement(self):
-        if self.take_btn['state']=='disabled': return
+        if self.take_btn['state']=='disabled' or self._busy(): return
         self.take_btn.config(state='disabled')
         try:
-            constante_proporcionalidad = 7.6
-            ref = float(self.velocity_entry.get()) * constante_proporcionalidad
+            ref = float(self.velocity_entry.get()) * self.VELOCITY_TO_FLOW
         except:
             messagebox.showerror("Error", "Velocidad inválida")
             self.take_btn.config(state='normal')
             return
-        if not (self.ser and self.ser.is_open):
+        if not self._connected():
             messagebox.showwarning("Error", "Puerto no conectado")
             self.take_btn.config(state='normal')
             return
-
-        self.ser.reset_input_buffer()
-        self.ser.write(f"{ref}\n".encode())
-
-        meas = []; flowAvg = None; prec = None; offset = None
-        t0, TO = time.time(), 60.0
+        self._start_run(ref, self.devices)
+
+    def _start_run(self, ref, devices):
+        # la misma referencia a todos los equipos a la vez: el punto dura lo
+        # que tarda el más lento, no la suma
+        now = time.time()
+        for d in devices:
+            self._pending.add(d)
+            self._to_console(d, d.start_run(ref, now))
+        # las corridas las alimenta read_serial; no se bloquea el loop de Tk
+
+    def _to_console(self, dev, events):
+        text = b"\n".join(ev[2] for ev in events if ev[2] is not None)
+        if not text: return
+        lines = text.decode(errors='ignore').split("\n")
+        if len(self.devices) > 1:
+            lines = [f"[{dev.name}] {l}" for l in lines]
+        self.console.append_lines(lines)
+
+    @timed("ui.eventos")
+    def _consume_events(self, dev, events):
+        if not events: return
+        self._to_console(dev, events)
+        discarded = dev.discarded
+        done, fresh = dev.feed(events)
+        if dev.discarded != discarded:
+            self._to_console(dev, [(None, None, b"[corrida] resumen de otra referencia, se descarta")])
+        if done is not None:
+            self._run_done(dev, done)
+        elif fresh:
+            self._live_update(dev)
+
+    def _live_update(self, dev):
+        # media/σ en curso mientras llegan las muestras, y parada anticipada
+        st = dev.stats
+        if st.n < 2: return
+        if dev is self.dev:
+            self.precision_var.set(f"{st.std:.4f}")
+            self.plots.live(dev.live, st.mean, st.std, st.sem)
+        if not self.early_stop_var.get() or dev.run['stop_sent']: return
         try:
-            while True:
-                if time.time()-t0 > TO:
-                    messagebox.showerror("Timeout","No llegó resumen")
-                    return
-                raw = self.ser.readline().decode(errors='ignore')
-                if not raw:
-                    self.master.update()
-                    continue
-                line = raw.strip(); low = line.lower()
-                self._console_insert(line+"\n")
-
-                if re.fullmatch(r'\d+(\.\d+)?', line):
-                    meas.append(float(line)); continue
-                m = re.search(r'promedio flujo\s*=\s*([-+]?\d*\.\d+)', low)
-                if m:
-                    flowAvg = float(m.group(1)); continue
-                m2 = re.search(r'precisión.*=\s*([-+]?\d*\.\d+)', low)
-                if m2:
-                    prec = float(m2.group(1)); continue
-                m3 = re.search(r'offset calculado\s*=\s*([-+]?\d*\.\d+)', low)
-                if m3:
-                    offset = float(m3.group(1))
-                    break
-                if low.startswith("exactitud"):
-                    break
-        finally:
-            self.take_btn.config(state='normal')
-
-        # si llegamos aquí con offset, pintarlo e irnos
-        if offset is not None:
-            self.offset = offset
-            messagebox.showinfo("Offset", f"Offset calculado = {offset:.4f} V")
-            # *inmediato* en la gráfica:
-            self.ax_scatter.scatter([0], [offset],
-                                    c='m', s=120, marker='X',
-                                    label="Offset", zorder=4)
-            self.ax_scatter.legend()
-            self.canvas.draw()
+            tol = float(self.tol_var.get())
+        except ValueError:
+            return
+        if st.settled(tol, self.EARLY_STOP_MIN):
+            dev.request_stop()
+            self._to_console(dev, [(None, None, f"[parada anticipada] n = {st.n}, σ media = {st.sem:.5f} V".encode())])
+
+    def _run_done(self, dev, run):
+        self._pending.discard(dev)
+        sw = self._sweep
+        if sw is None:
+            if not self._pending:
+                self.take_btn.config(state='normal')
+            self._finish_measurement(dev, run)
+            return
+        if self._pending:
+            # el punto sigue hasta que termine el equipo más lento
+            self._finish_measurement(dev, run, quiet=True)
+            return
+        # el próximo punto sale antes de procesar y graficar este: el sketch
+        # ya está midiendo mientras la UI trabaja
+        sw.point_done()
+        ref = sw.next_point()
+        if ref is not None:
+            self._sweep_send(sw, ref, self.devices)
+        self._finish_measurement(dev, run, quiet=True)
+        if ref is None:
+            self._end_sweep("Barrido detenido" if sw.stopped else "Barrido terminado")
+
+    @timed("corrida.procesado")
+    def _finish_measurement(self, dev, run, quiet=False):
+        # quiet: durante un barrido no se abren diálogos, todo va a consola
+        def note(msg):
+            self._to_console(dev, [(None, None, f"[barrido] {msg}".encode())])
+        try:
+            idx = dev.session.add_run(run)
+        except ValueError as e:
+            if quiet: note(f"corrida descartada: {e}")
+            else: messagebox.showerror("Parse error", f"{dev.name}: {e}")
+            return
+        if dev is not self.dev:
+            # equipo que no se está mostrando: solo la vista comparada
+            if idx is None and quiet: note(f"Offset calculado = {dev.session.offset:.4f} V")
+            self._refresh_compare()
             return
 
-        # validación normal
-        if flowAvg is None or prec is None or not meas:
-            messagebox.showerror("Parse error",
-                f"Faltan datos: flowAvg={flowAvg}, prec={prec}, N={len(meas)}")
+        # corrida de offset: pintarlo e irnos
+        if idx is None:
+            msg = f"Offset calculado = {dev.session.offset:.4f} V"
+            if quiet: note(msg)
+            else: messagebox.showinfo("Offset", msg)
+            self.update_plots()
             return
 
-        voltAvg = float(np.mean(meas))
-        exact_pct = abs(ref-flowAvg)/ref*100 if ref!=0 else 0.0
-        self.precision_var.set(f"{prec:.4f}")
-        self.experiments.append({
-            'ref':ref,'flowAvg':flowAvg,'voltAvg':voltAvg,
-            'prec':prec,'exact':exact_pct,'offset':offset,'meas':meas
-        })
-        self.selected=[len(self.experiments)-1]
+        self.precision_var.set(f"{run['prec']:.4f}")
+        self.selected=[idx]
         self._update_summary(self.selected[0])
         self.update_plots()
 
     def _update_summary(self, idx):
-        e = self.experiments[idx]
+        e = self.session.experiments[idx]
         rel_prec = e['prec']/e['voltAvg']*100
         self.info_var.set(
             f"1. Referencia:       {e['ref']:.2f} slm\n"
@@ -187,241 +416,264 @@ class FlowCalibrationApp:
         )
 
     def read_serial(self):
-        if self.ser and self.ser.is_open:
-            try:
-                l = self.ser.readline().decode(errors='ignore')
-                if l: self._console_insert(l)
-            except: pass
-        self.master.after(100, self.read_serial)
-
-    def _console_insert(self, txt):
-        self.console_text.configure(state='normal')
-        self.console_text.insert('end', txt)
-        self.console_text.see('end')
-        self.console_text.configure(state='disabled')
+        # drena en lote lo que dejó cada hilo lector desde el último tick
+        now = time.time()
+        for d in list(self.devices):
+            r = d.reader
+            self._consume_events(d, d.drain_events())
+            if r.error is not None:
+                err, r.error = r.error, None
+                if self._sweep is not None:
+                    self._end_sweep("Barrido abortado")
+                self._abort_run(d)
+                messagebox.showerror("Puerto serie", f"Error de lectura en {d.name}:\n{err}")
+            if d.run is not None and now-d.run['t0'] > self._run_limit:
+                self._run_timeout(d)
+        if self._sweep is not None:
+            self._sweep_status()
+        self.master.after(self.POLL_MS, self.read_serial)
+
+    def _run_timeout(self, dev):
+        ref = dev.run['ref']
+        self._abort_run(dev)
+        sw = self._sweep
+        note = lambda msg: self._to_console(dev, [(None, None, f"[barrido] {msg}".encode())])
+        if sw is None:
+            messagebox.showerror("Timeout", f"No llegó resumen de {dev.name}")
+        elif sw.retry(dev.name):
+            note(f"timeout, reintento {sw.attempts[dev.name]}/{sw.retries}")
+            self._sweep_send(sw, ref, [dev])
+        else:
+            if not sw.stopped:
+                note(f"timeout, se salta {ref:.2f} slm")
+            if not self._pending:
+                sw.point_done()   # también un punto salteado cuenta para la ETA
+                self._sweep_advance(sw)
+
+    def _abort_run(self, dev):
+        dev.abort()
+        self._pending.discard(dev)
+        if self._sweep is None and not self._pending:
+            self.take_btn.config(state='normal')
+        if dev is self.dev:
+            self.update_plots()   # saca la traza en vivo
+
+    # ── Barrido ─────────────────────────────────────────────────────────
+    def start_sweep(self):
+        if self._sweep is not None or self._busy(): return
+        if not self._connected():
+            messagebox.showwarning("Barrido", "Puerto no conectado")
+            return
+        try:
+            refs = parse_points(self.sweep_points_var.get())
+            repeats = int(self.sweep_repeats_var.get())
+            settle = float(self.sweep_settle_var.get())
+        except ValueError as e:
+            messagebox.showerror("Barrido", f"Parámetros inválidos:\n{e}")
+            return
+        refs = [v*self.VELOCITY_TO_FLOW for v in refs]
+        self._sweep = sw = SweepScheduler(refs, repeats, self.SWEEP_RETRIES, max(settle, 0.0))
+        self.take_btn.config(state='disabled')
+        self.sweep_btn.config(text="Detener barrido", command=self.stop_sweep)
+        self._sweep_advance(sw)
+
+    def stop_sweep(self):
+        # las corridas en curso terminan normalmente; no se manda nada más
+        # (un punto que estaba asentando ya no sale, ver go() en _sweep_send)
+        sw = self._sweep
+        if sw is None: return
+        sw.stop()
+        self._pending = {d for d in self._pending if d.busy}
+        if not self._pending:
+            self._end_sweep("Barrido detenido")
+
+    def _sweep_advance(self, sw):
+        ref = sw.next_point()
+        if ref is None:
+            self._end_sweep("Barrido detenido" if sw.stopped else "Barrido terminado")
+        else:
+            self._sweep_send(sw, ref, self.devices)
+
+    def _sweep_send(self, sw, ref, devices):
+        # asentamiento: se espera antes de mandar la referencia al sketch, y
+        # si alguno quedó midiendo una corrida vencida, a que llegue su
+        # resumen (lo que se manda antes queda en su buffer y corre después)
+        self._pending.update(devices)
+        deadline = time.time() + self._run_limit
+        def go():
+            if self._sweep is not sw or sw.stopped: return   # detenido mientras asentaba
+            if time.time() < deadline and not all(d.idle for d in devices):
+                self.master.after(self.POLL_MS, go)
+                return
+            sw.started()
+            self._start_run(ref, devices)
+        if sw.settle > 0:
+            self.master.after(int(sw.settle*1000), go)
+        else:
+            go()
+        self._sweep_status()
+
+    def _sweep_status(self):
+        sw = self._sweep
+        text = f"Punto {sw.index}/{sw.total}"
+        if sw.current is not None:
+            text += f": {sw.current:.2f} slm"
+        eta = sw.eta()
+        if eta is not None:
+            text += f"  ·  ETA {int(eta)//60}:{int(eta)%60:02d}"
+        self.sweep_status_var.set(text)
+
+    def _end_sweep(self, msg):
+        sw, self._sweep = self._sweep, None
+        self._pending = {d for d in self._pending if d.busy}
+        self.sweep_btn.config(text="Iniciar barrido", command=self.start_sweep)
+        if not self._pending:
+            self.take_btn.config(state='normal')
+        if sw.failed:
+            # por equipo: el resto de los puertos sí midió esos puntos
+            miss = [f"{r:.2f} slm en {', '.join(devs)}" for r, devs in sw.failed]
+            msg += f" ({len(miss)} puntos fallidos: " + "; ".join(miss) + ")"
+        self.sweep_status_var.set(msg)
+        self.console.append_lines([f"[barrido] {msg}"])
+
+    # ── Comparación entre equipos ───────────────────────────────────────
+    def show_compare(self):
+        if self.plots is None: return   # antes de _late_init
+        if self._compare is not None:
+            self._compare[0].lift()
+            return
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
+        from graficas import ComparisonPlots
+        win = tk.Toplevel(self.master)
+        win.title("Comparación de equipos")
+        fig = Figure(figsize=(6,6))
+        canvas = FigureCanvasTkAgg(fig, master=win)
+        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self._compare = (win, ComparisonPlots(fig, canvas))
+        def close():
+            self._compare = None
+            win.destroy()
+        win.protocol("WM_DELETE_WINDOW", close)
+        self._refresh_compare()
+
+    def _refresh_compare(self):
+        if self._compare is None: return
+        from calibracion import MODES
+        mode = MODES[self.fit_mode_var.get()]
+        devices = self.devices or [None]
+        self._compare[1].update([(d.name if d else "offline",
+                                  (d.session if d else self._offline),
+                                  (d.session if d else self._offline).fit(mode)) for d in devices])
 
     def on_pick(self, event):
-        idx = event.ind[0]
+        if event.artist is not self.plots.scatter: return
+        idx = self.plots.scatter_index(event.ind[0])
         if event.mouseevent.button==3 and messagebox.askyesno("Eliminar",f"Borrar exp {idx+1}?"):
-            del self.experiments[idx]; self.selected=[]
-        else:
-            self.selected=[idx]
-        if self.selected: self._update_summary(self.selected[0])
-        self.update_plots()
+            self.session.delete(idx); self.selected=[]
+            self.update_plots()
+            return
+        self.selected=[idx]
+        self._update_summary(idx)
+        self.plots.select(self.session.experiments, self.selected)
 
     def reset_all(self):
+        if self.plots is None: return   # antes de _late_init
         if messagebox.askyesno("Reiniciar","Borrar todo?"):
-            self.experiments=[]; self.selected=[]; self.info_var.set(""); self.update_plots()
+            self.session.clear_runs(); self.selected=[]; self.info_var.set("")
+            self.console.clear()   # solo lo visible; el log queda para guardarlo
+            self.update_plots()
+
+    def current_fit(self):
+        if self.plots is None: return   # antes de _late_init
+        from calibracion import MODES
+        return self.session.fit(MODES[self.fit_mode_var.get()])
+
+    def show_diagnostics(self):
+        from diagnostico import DiagnosticsWindow
+        if self._diag is not None and self._diag.winfo_exists():
+            self._diag.lift()
+            return
+        self._diag = DiagnosticsWindow(self.master, PERF)
 
+    @timed("ui.update_plots")
     def update_plots(self):
-        # ── Scatter + linealización (ahora incluye offset) ──────────────
-        self.ax_scatter.clear()
-        refs = np.array([e['ref'] for e in self.experiments])
-        volts = np.array([e['voltAvg'] for e in self.experiments])
-        # añadir offset al dataset si existe
-        if self.offset is not None:
-            refs = np.append(refs, 0.0)
-            volts = np.append(volts, self.offset)
-
-        if refs.size>0:
-            cols = ['r' if i in self.selected else 'C0' for i in range(len(refs))]
-            sz = [100 if i in self.selected else 60 for i in range(len(refs))]
-            self.ax_scatter.scatter(refs, volts, c=cols, s=sz,
-                                    picker=5, edgecolor='k', zorder=3,
-                                    label="Mediciones")
-            # regresión
-            if len(refs)>1:
-                m,b = np.polyfit(refs, volts, 1)
-                r2 = np.corrcoef(refs, volts)[0,1]**2
-                xs = np.linspace(refs.min(), refs.max(), 100)
-                self.ax_scatter.plot(xs, m*xs+b,
-                                     label=f"y={m:.3f}x+{b:.3f}, R²={r2:.3f}",
-                                     zorder=2)
-            self.ax_scatter.legend()
-        else:
-            self.ax_scatter.set_title("Sin datos")
-
-        self.ax_scatter.set_xlabel("Flujo de referencia (slm)")
-        self.ax_scatter.set_ylabel("Voltaje (V)")
-
-        # ── Campana de desviaciones ───────────────────────────────────────
-        self.ax_dev.clear()
-        if self.experiments and self.selected:
-            idx = self.selected[0]
-            data = np.array(self.experiments[idx]['meas'])
-            mu, dev, std = data.mean(), data-data.mean(), data.std()
-            lim = max(4*std, abs(dev).max())
-            x = np.linspace(-lim, lim, 300)
-            pdf = np.exp(-0.5*(x/std)**2)
-            self.ax_dev.plot(x, pdf, color='C0', zorder=2)
-            ypts = np.exp(-0.5*(dev/std)**2)
-            self.ax_dev.scatter(dev, ypts, color='C0', s=30, alpha=0.6, zorder=3)
-            ki = np.argmax(abs(dev))
-            wd, wp = dev[ki], np.exp(-0.5*(dev[ki]/std)**2)
-            self.ax_dev.scatter(wd, wp, color='r', edgecolor='k', s=80, zorder=4)
-            self.ax_dev.text(wd, wp+0.05, f"{data[ki]:.2f}", ha="center", va="bottom", color='r')
-            self.ax_dev.set_title(f"Prom dev = {mu:.2f} V   σ = {std:.2f} V")
-        self.ax_dev.set_xlabel("Desviación (V)")
-        self.ax_dev.set_ylabel("Densidad relativa")
-
-        # ── Barra peor desviación relativa ─────────────────────────────────
-        self.ax_bar.clear()
-        if self.experiments:
-            worst_pct = []
-            for e in self.experiments:
-                arr = np.array(e['meas']); mu=arr.mean()
-                worst_pct.append(float(np.max(np.abs(arr-mu))/mu*100))
-            xs = np.arange(1, len(worst_pct)+1)
-            cols = ['r' if i in self.selected else 'C0' for i in range(len(xs))]
-            self.ax_bar.bar(xs, worst_pct, color=cols, edgecolor='k', zorder=3)
-            self.ax_bar.set_xticks(xs)
-            self.ax_bar.set_xlabel("Experimento")
-            self.ax_bar.set_ylabel("Máx desviación (%)")
-            self.ax_bar.set_title("Peor desviación relativa")
-        self.canvas.draw()
+        if self.plots is None: return   # antes de _late_init
+        s = self.session
+        self.plots.update(s.experiments, s.offset, self.selected, self.current_fit())
+        self._refresh_compare()
 
     def export_data(self):
+        if self.plots is None: return   # antes de _late_init
         path = filedialog.asksaveasfilename(defaultextension=".txt", filetypes=[("Texto","*.txt")])
         if not path: return
-        with open(path,"w") as f:
-            for i,e in enumerate(self.experiments,1):
-                f.write(f"=== Exp {i} ===\n")
-                f.write(f"Referencia:        {e['ref']:.2f} slm\n")
-                f.write(f"FlowAvg:           {e['flowAvg']:.2f} slm\n")
-                f.write(f"VoltAvg:           {e['voltAvg']:.3f} V\n")
-                f.write(f"σ:                  {e['prec']:.3f} V\n")
-                f.write(f"Exactitud:         {e['exact']:.1f} %\n")
-                if e.get('offset') is not None:
-                    f.write(f"Offset:            {e['offset']:.4f} V\n")
-                f.write(f"N datos:           {len(e['meas'])}\nMediciones:\n")
-                for j in range(0,len(e['meas']),10):
-                    chunk=e['meas'][j:j+10]
-                    f.write("  "+", ".join(f"{v:.3f}" for v in chunk)+"\n")
-                f.write("\n")
+        from reporte import export_txt
+        export_txt(path, self.session.experiments)
         messagebox.showinfo("Exportado","TXT guardado")
 
+    def save_session(self):
+        if self.plots is None: return   # antes de _late_init
+        path = filedialog.asksaveasfilename(defaultextension=".cal", filetypes=[("Sesión","*.cal")])
+        if not path: return
+        from sesion import save_session
+        save_session(path, self.session, self.selected)
+        messagebox.showinfo("Sesión", "Sesión guardada")
+
+    def load_session(self):
+        # se agrega a lo que ya hay: sirve para retomar o juntar campañas
+        if self.plots is None: return   # antes de _late_init
+        path = filedialog.askopenfilename(filetypes=[("Sesión","*.cal")])
+        if not path: return
+        from sesion import load_session
+        try:
+            sel = load_session(path, self.session)
+        except (OSError, ValueError, KeyError) as e:
+            messagebox.showerror("Sesión", f"No se pudo abrir {path}:\n{e}")
+            return
+        if sel:
+            self.selected = sel[:1]
+            self._update_summary(self.selected[0])
+        self.update_plots()
+
     def generate_report(self):
+        if self.plots is None: return   # antes de _late_init
+        if self._report is not None:
+            messagebox.showinfo("Reporte PDF", "Ya se está generando un reporte")
+            return
         path = filedialog.asksaveasfilename(defaultextension=".pdf",
                                             filetypes=[("PDF","*.pdf")])
         if not path:
             return
 
-        # ── Cálculos previos ────────────────────────────────────────────────
-        # Recolectar refs y volts (incluyendo offset como punto)
-        refs  = np.array([e['ref']     for e in self.experiments])
-        volts = np.array([e['voltAvg'] for e in self.experiments])
-        if self.offset is not None:
-            refs  = np.append(refs, 0.0)
-            volts = np.append(volts, self.offset)
-
-        # Ajuste lineal global
-        m, b = np.polyfit(refs, volts, 1)
-        r2   = np.corrcoef(refs, volts)[0,1]**2
-
-        # --- NUEVO: Cálculo de peores métricas ---
-        # Peor exactitud (%)
-        worst_exact = max((e['exact'] for e in self.experiments), default=0.0)
-        # Mayor sigma (desviación estándar en V)
-        worst_sigma = max((np.std(e['meas']) for e in self.experiments), default=0.0)
-        # ─────────────────────────────────────────────────────────────────────
-
-        # ── Preparar PDF ────────────────────────────────────────────────────
-        c = pdfcanvas.Canvas(path, pagesize=letter)
-        w, h = letter
-
-        # Título
-        c.setFont("Helvetica-Bold", 16)
-        c.drawString(2*cm, h-2*cm, "Reporte de Calibración de Flujómetro")
-
-        # Empezamos a escribir desde aquí hacia abajo
-        y = h - 2.7*cm
-        c.setFont("Helvetica", 12)
-
-        # Offset (si existe)
-        if self.offset is not None:
-            c.drawString(2*cm, y, f"Offset calculado: {self.offset:.4f} V")
-            y -= 0.6*cm
-
-        # --- NUEVO: Peores métricas al inicio ---
-        c.drawString(2*cm, y, f"Peor exactitud:     {worst_exact:.1f} %")
-        y -= 0.6*cm
-        c.drawString(2*cm, y, f"Mayor σ (desv. est.): {worst_sigma:.3f} V")
-        y -= 0.8*cm
-        # ─────────────────────────────────────────────────────────────────
-
-        # Ecuación global
-        c.drawString(2*cm, y, f"Linealización global: y = {m:.3f} x + {b:.3f}, R² = {r2:.3f}")
-
-        # ── Detalles por experimento ───────────────────────────────────────
-        y -= 1*cm
-        text = c.beginText(2*cm, y)
-        text.setFont("Helvetica", 10)
-        text.setLeading(12)
-        for i, e in enumerate(self.experiments, start=1):
-            rel_prec = e['prec'] / e['voltAvg'] * 100
-            exact_pct = e['exact']
-            text.textLine(f"Experimento {i}: Ref={e['ref']:.2f} slm, "
-                          f"FlowAvg={e['flowAvg']:.2f} slm, VoltAvg={e['voltAvg']:.3f} V, "
-                          f"σ={e['prec']:.3f} V ({rel_prec:.1f}%), Exactitud={exact_pct:.1f}%, "
-                          f"N={len(e['meas'])}")
-            if e.get('offset') is not None:
-                text.textLine(f"  Offset: {e['offset']:.4f} V")
-            text.textLine("  Mediciones crudas:")
-            for j in range(0, len(e['meas']), 10):
-                chunk = e['meas'][j:j+10]
-                line  = "    " + ", ".join(f"{v:.3f}" for v in chunk)
-                text.textLine(line)
-            text.textLine("")
-            if text.getY() < 4*cm:
-                c.drawText(text)
-                c.showPage()
-                text = c.beginText(2*cm, h-2*cm)
-                text.setFont("Helvetica", 10)
-                text.setLeading(12)
-        c.drawText(text)
-
-        # ── Página de gráficas ─────────────────────────────────────────────
-        c.showPage()
-
-        # 1) Gráfica de linealización
-        fig1, ax1 = plt.subplots(figsize=(4,3))
-        ax1.scatter(refs, volts, zorder=3)
-        xs = np.linspace(refs.min(), refs.max(), 100)
-        ax1.plot(xs, m*xs + b, zorder=2)
-        ax1.set_xlabel("Flujo de referencia (slm)")
-        ax1.set_ylabel("Voltaje (V)")
-        ax1.set_title("Calibración global")
-        buf1 = io.BytesIO()
-        fig1.savefig(buf1, format='png')
-        plt.close(fig1)
-        buf1.seek(0)
-        c.drawImage(ImageReader(buf1), 2*cm, h/2, w-4*cm, h/2-3*cm)
-
-        # 2) Gráfica de peor desviación relativa
-        worst_pct = [float(np.max(np.abs(np.array(e['meas'])-np.array(e['meas']).mean()))/
-                           np.array(e['meas']).mean()*100)
-                     for e in self.experiments]
-        fig2, ax2 = plt.subplots(figsize=(4,3))
-        ax2.bar(np.arange(1, len(worst_pct)+1), worst_pct, edgecolor='k')
-        ax2.set_xlabel("Experimento")
-        ax2.set_ylabel("Máx desviación (%)")
-        ax2.set_title("Peor desviación relativa")
-        buf2 = io.BytesIO()
-        fig2.savefig(buf2, format='png')
-        plt.close(fig2)
-        buf2.seek(0)
-        c.drawImage(ImageReader(buf2), 2*cm, 2*cm, w-4*cm, h/2-5*cm)
-
-        # Límite máximo absoluto del sensor
-        overall = max(worst_pct, default=0.0)
-        c.setFont("Helvetica-Bold", 12)
-        c.drawString(2*cm, 1.5*cm,
-                     f"Límite máximo absoluto del sensor: {overall:.1f}%")
-
-        c.save()
-        messagebox.showinfo("Reporte PDF", "Reporte PDF generado exitosamente")
+        fit = self.current_fit()
+        if fit is None:
+            messagebox.showwarning("Reporte PDF", "Se necesitan al menos dos puntos para el ajuste")
+            return
+        # la sesión puede seguir cambiando: el hilo trabaja sobre una copia
+        from reporte import snapshot, ReportJob
+        self._report = ReportJob(path, snapshot(self.session, fit, self.fit_mode_var.get()))
+        self._report.start()
+        self.report_cancel_btn.config(state='normal')
+        self.master.after(self.POLL_MS, self._poll_report)
+
+    def _poll_report(self):
+        job = self._report
+        self.report_bar['value'] = job.progress
+        if job.is_alive():
+            self.master.after(self.POLL_MS, self._poll_report)
+            return
+        self._report = None
+        self.report_bar['value'] = 0
+        self.report_cancel_btn.config(state='disabled')
+        if job.error is not None:
+            messagebox.showerror("Reporte PDF", f"No se pudo generar el reporte:\n{job.error}")
+        elif not job.cancelled:
+            messagebox.showinfo("Reporte PDF", "Reporte PDF generado exitosamente")
 
 if __name__=="__main__":
     root=tk.Tk()
     app=FlowCalibrationApp(root)
-    root.mainloop()
+    try:
+        root.mainloop()
+    finally:
+        for d in app.devices: d.stop()
@@ -3,6 +3,14 @@ const byte PIN_SENSOR        = A1;   // No hace falta pinMode()
 const int  TIEMPO_MUESTREO_MS = 100; // ms
 const int  N_MUESTRAS         = 100; // muestras por corrida
 const int  MAX_CORRIDAS       = 50;  // número máximo de corridas
+const long BAUD_TEXTO         = 9600;
+const int  MIN_MUESTRAS       = 10;  // mínimo antes de aceptar una parada "s"
+
+// --- Modo binario (comando "b<baud>[,<periodo_ms>]", "t" vuelve a texto) ---
+// Trama: A5 5A | seq | MUESTRAS_TRAMA cuentas ADC u16 LE | checksum
+// checksum = suma de seq y de los bytes de las cuentas (mod 256)
+const byte     MUESTRAS_TRAMA = 8;
+const uint16_t RELLENO_TRAMA  = 0xFFFF;  // no es una cuenta válida
 
 // --- Memoria para resultados (en SRAM global) ---
 float referencia[MAX_CORRIDAS];     // slm
@@ -16,17 +24,25 @@ float offsetVoltaje = 0.0f;
 // --- Variables de estado ---
 float refActual = 0.0;
 bool  midiendo  = false;
+bool  binario   = false;
+int   periodoMs = TIEMPO_MUESTREO_MS;
+byte  seqTrama  = 0;
+uint16_t trama[MUESTRAS_TRAMA];
+byte  nTrama    = 0;
 
 // --- Prototipos ---
 void mensajeBienvenida();
 void loop();
 void medirPromedio();
-float calcularPrecision(const float datos[], float media);
+float calcularPrecision(const float datos[], float media, int n);
+bool  pidioParada();
 float calcularExactitud(float promedioFlujo, float flujoReal);
 void imprimirCSV();
+void cambiarModo(bool bin, long baud);
+void enviarTrama();
 
 void setup() {
-  Serial.begin(9600);
+  Serial.begin(BAUD_TEXTO);
   while (!Serial) ;  // para Leonardo/MKR
   mensajeBienvenida();
 }
@@ -46,6 +62,23 @@ void loop() {
       while (1) ;  // fin
     }
 
+    // "s" fuera de una corrida: la parada llegó tarde, se ignora
+    if (buf[0] == 's' || buf[0] == 'S') return;
+
+    // Comandos de modo: "b115200" / "b115200,5" y "t"
+    if (!midiendo && (buf[0] == 'b' || buf[0] == 'B')) {
+      char *coma = strchr(buf, ',');
+      periodoMs = coma ? atoi(coma + 1) : TIEMPO_MUESTREO_MS;
+      if (periodoMs < 1) periodoMs = 1;  // delay() es sin signo: -5 serían ~49 días
+      cambiarModo(true, atol(buf + 1));
+      return;
+    }
+    if (!midiendo && (buf[0] == 't' || buf[0] == 'T')) {
+      periodoMs = TIEMPO_MUESTREO_MS;
+      cambiarModo(false, BAUD_TEXTO);
+      return;
+    }
+
     // Nuevo valor de referencia
     if (!midiendo && len > 0) {
       refActual = atof(buf);
@@ -62,10 +95,11 @@ void medirPromedio() {
   static float voltajes[N_MUESTRAS];  // mueve a estático para ahorrar pila
   float sumaVolt = 0.0;
   float sumaFlujo = 0.0;
+  int   n = N_MUESTRAS;
 
   Serial.println(F(">> Medición en curso, espera..."));
 
-  // 1) Leer N muestras
+  // 1) Leer hasta N muestras (el host puede cortar antes con "s")
   for (int i = 0; i < N_MUESTRAS; i++) {
     int   adc  = analogRead(PIN_SENSOR);
     float volt = adc * 5.0f / 1023.0f;
@@ -75,13 +109,23 @@ void medirPromedio() {
     sumaVolt   += volt;
     sumaFlujo  += flujo;
 
-    delay(TIEMPO_MUESTREO_MS);
-    Serial.println(volt);
+    delay(periodoMs);
+    if (binario) {
+      trama[nTrama++] = adc;
+      if (nTrama == MUESTRAS_TRAMA) enviarTrama();
+    } else {
+      Serial.println(volt);
+    }
+    if (i + 1 >= MIN_MUESTRAS && pidioParada()) {
+      n = i + 1;
+      break;
+    }
   }
+  if (binario && nTrama > 0) enviarTrama();  // última trama con relleno
 
   // 2) Promedios
-  float promV   = sumaVolt  / N_MUESTRAS;
-  float promF   = sumaFlujo / N_MUESTRAS;
+  float promV   = sumaVolt  / n;
+  float promF   = sumaFlujo / n;
 
 // 3) Si enviaste referencia = 0 → calcular solo offset y salir
 if (refActual == 0.0f) {
@@ -95,7 +139,7 @@ if (refActual == 0.0f) {
 }
 
   // 3) Precisión y exactitud
-  float desv    = calcularPrecision(voltajes, promV);
+  float desv    = calcularPrecision(voltajes, promV, n);
   float errAbs  = calcularExactitud(promF, refActual);
 
 
@@ -129,13 +173,22 @@ if (refActual == 0.0f) {
   midiendo = false;
 }
 
-float calcularPrecision(const float datos[], float media) {
+float calcularPrecision(const float datos[], float media, int n) {
   float suma2 = 0.0;
-  for (int i = 0; i < N_MUESTRAS; i++) {
+  for (int i = 0; i < n; i++) {
     float d = datos[i] - media;
     suma2 += d * d;
   }
-  return sqrt(suma2 / (N_MUESTRAS - 1));
+  return sqrt(suma2 / (n - 1));
+}
+
+// "s\n" del host durante la corrida: la media ya es suficientemente estable
+bool pidioParada() {
+  if (!Serial.available()) return false;
+  char c = Serial.peek();
+  if (c != 's' && c != 'S') return false;
+  while (Serial.available() && Serial.read() != '\n') ;
+  return true;
 }
 
 float calcularExactitud(float promedioFlujo, float flujoReal) {
@@ -160,6 +213,36 @@ void imprimirCSV() {
   Serial.println(F("Copia y pega en Excel :)"));
 }
 
+void cambiarModo(bool bin, long baud) {
+  if (baud <= 0) baud = BAUD_TEXTO;
+  // se anuncia con el baud viejo; el host cambia al leer esta línea
+  Serial.print(bin ? F("Modo binario: ") : F("Modo texto: "));
+  Serial.print(baud);
+  Serial.println(F(" baud"));
+  Serial.flush();
+  Serial.end();
+  Serial.begin(baud);
+  binario = bin;
+}
+
+void enviarTrama() {
+  while (nTrama < MUESTRAS_TRAMA) trama[nTrama++] = RELLENO_TRAMA;
+  byte chk = seqTrama;
+  Serial.write(0xA5);
+  Serial.write(0x5A);
+  Serial.write(seqTrama);
+  for (byte i = 0; i < MUESTRAS_TRAMA; i++) {
+    byte lo = trama[i] & 0xFF;
+    byte hi = trama[i] >> 8;
+    Serial.write(lo);
+    Serial.write(hi);
+    chk += lo + hi;
+  }
+  Serial.write(chk);
+  seqTrama++;
+  nTrama = 0;
+}
+
 void mensajeBienvenida() {
   Serial.println(F("=== Calibración de flujo ==="));
   Serial.println(F("Escribe valor del anemómetro (slm) y Enter."));
@@ -0,0 +1,159 @@
+# Procesado por lotes sin Tk: toma capturas crudas del puerto serie (lo que
+# imprime nuevo_codiog.ino, o el log guardado desde la consola) y genera por
+# cada una el TXT de export_data y el reporte PDF de generate_report. Un log
+# de la consola con varios equipos da un TXT/PDF por equipo.
+#
+#   python procesar_lote.py capturas/*.log -o reportes/ -j 8
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from pathlib import Path
+
+import matplotlib
+matplotlib.use("Agg")
+
+from calibracion import MODES  # noqa: E402
+from protocolo import ProtocolParser, RunAssembler  # noqa: E402
+from reporte import build_pdf, export_txt, snapshot  # noqa: E402
+from sesion import CalibrationSession  # noqa: E402
+
+CHUNK = 1 << 16
+# "[COM3] " que antepone la consola a cada línea con más de un equipo (el
+# sketch nunca imprime líneas que empiecen con "[")
+DEVICE_PREFIX = re.compile(rb"\[([\x21-\x5c\x5e-\x7e][\x20-\x5c\x5e-\x7e]{0,63})\] ")
+
+
+def load_capture(path):
+    # {equipo: (sesión, corridas incompletas)}; una captura cruda o un log de
+    # un solo equipo da un único grupo con nombre None. Las notas de la app
+    # ("[barrido] Offset calculado = ...") también calzan con el prefijo: un
+    # grupo con nombre cuenta como equipo solo si tiene corridas.
+    groups = {}
+
+    def feed(name, data):
+        g = groups.get(name)
+        if g is None:
+            g = groups[name] = [ProtocolParser(), RunAssembler(), CalibrationSession(), 0]
+        for kind, val, _ in g[0].feed(data):
+            run = g[1].push(kind, val)
+            if run is None: continue
+            try:
+                g[2].add_run(run)
+            except ValueError:
+                g[3] += 1
+
+    tail = b""
+    with open(path, "rb") as f:
+        # el b"\n" final cierra una última línea sin salto de línea
+        for chunk in chain(iter(lambda: f.read(CHUNK), b""), [b"\n"]):
+            data = tail + chunk
+            cut = data.rfind(b"\n") + 1
+            data, tail = data[:cut], data[cut:]
+            if not data.startswith(b"[") and b"\n[" not in data:
+                feed(None, data)   # sin prefijos: de corrido, como viene
+                continue
+            for line in data[:-1].split(b"\n"):
+                m = DEVICE_PREFIX.match(line)
+                if m:
+                    feed(m.group(1).decode("ascii"), line[m.end():] + b"\n")
+                else:
+                    feed(None, line + b"\n")
+    out = {name: (g[2], g[3]) for name, g in groups.items()
+           if len(g[2].experiments) or g[3]
+           or (name is None and g[2].offset is not None)}
+    return out or {None: (CalibrationSession(), 0)}
+
+
+def output_stems(paths):
+    # nombre de salida por captura: el del archivo, y si se repite en otra
+    # carpeta (dia1/sesion.log, dia2/sesion.log) la ruta relativa a la
+    # carpeta común con "_"; lo que aún choque lleva sufijo -2, -3, ...
+    paths = [Path(p).resolve() for p in paths]
+    count = {}
+    for p in paths:
+        count[p.stem] = count.get(p.stem, 0) + 1
+    try:
+        base = Path(os.path.commonpath([p.parent for p in paths])) if paths else None
+    except ValueError:   # Windows: capturas en unidades distintas
+        base = None
+    stems, used = [], set()
+    for p in paths:
+        stem = p.stem
+        if count[stem] > 1:
+            rel = p.relative_to(base if base is not None else p.anchor)
+            stem = "_".join(rel.with_suffix("").parts)
+        name, k = stem, 1
+        while name in used:
+            k += 1
+            name = f"{stem}-{k}"
+        used.add(name)
+        stems.append(name)
+    return stems
+
+
+def device_suffix(name):
+    # "/dev/ttyUSB0" → "dev_ttyUSB0", para nombres de archivo
+    return re.sub(r"[^\w.-]+", "_", name or "sin_equipo").strip("_")
+
+
+def process_file(path, stem, fit_label, pdf=True):
+    # stem: ruta de salida sin extensión (ver output_stems); con varios
+    # equipos se le agrega el nombre de cada uno
+    t0 = time.perf_counter()
+    groups = load_capture(path)
+    runs = samples = skipped = 0
+    msgs = []
+    for name, (session, sk) in groups.items():
+        out = stem if len(groups) == 1 else f"{stem}_{device_suffix(name)}"
+        st = session.experiments
+        export_txt(f"{out}.txt", st)
+        runs += len(st); samples += int(st.lengths().sum()); skipped += sk
+        if pdf:
+            fit = session.fit(MODES[fit_label])
+            if fit is None:
+                msgs.append(f"sin PDF{'' if name is None else ' de ' + name}: menos de dos puntos para el ajuste")
+            else:
+                build_pdf(f"{out}.pdf", snapshot(session, fit, fit_label))
+    if len(groups) > 1:
+        msgs.insert(0, f"{len(groups)} equipos")
+    return {'path': str(path), 'runs': runs, 'samples': samples,
+            'skipped': skipped, 'seconds': time.perf_counter()-t0, 'msg': "; ".join(msgs)}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Reprocesa capturas serie y genera TXT + PDF por archivo.")
+    ap.add_argument("files", nargs="+", help="capturas crudas del puerto serie")
+    ap.add_argument("-o", "--outdir", default=".", help="carpeta de salida (por defecto la actual)")
+    ap.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="procesos en paralelo")
+    ap.add_argument("--ajuste", choices=list(MODES), default="ordinario", help="modo de linealización")
+    ap.add_argument("--sin-pdf", action="store_true", help="solo exportar el TXT")
+    args = ap.parse_args(argv)
+
+    os.makedirs(args.outdir, exist_ok=True)
+    t0 = time.perf_counter()
+    n_files = n_samples = n_err = 0
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        futs = {pool.submit(process_file, p, Path(args.outdir)/stem, args.ajuste, not args.sin_pdf): p
+                for p, stem in zip(args.files, output_stems(args.files))}
+        for fut, p in futs.items():
+            try:
+                r = fut.result()
+            except Exception as e:
+                n_err += 1
+                print(f"ERROR {p}: {e}", file=sys.stderr)
+                continue
+            n_files += 1; n_samples += r['samples']
+            extra = f", {r['skipped']} incompletas" if r['skipped'] else ""
+            extra += f" ({r['msg']})" if r['msg'] else ""
+            print(f"{r['path']}: {r['runs']} corridas, {r['samples']} muestras, {r['seconds']:.2f} s{extra}")
+    dt = time.perf_counter() - t0
+    print(f"{n_files} archivos en {dt:.2f} s: {n_files/dt:.1f} archivos/s, {n_samples/dt:,.0f} muestras/s")
+    return 1 if n_err else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+import re
+from array import array
+
+import numpy as np
+
+# ── Tipos de evento ───────────────────────────────────────────────────────
+# Cada evento es una tupla (tipo, valor, línea). La línea va en bytes tal
+# cual llegó (sin \r\n) para la consola; es None en eventos sintéticos.
+# SAMPLES trae un bloque de muestras (ndarray) decodificado de tramas
+# binarias, DROP el número de tramas perdidas y MODE el baud anunciado por
+# el sketch al cambiar de modo.
+TEXT, SAMPLE, REF, FLOW, SIGMA, EXACT, OFFSET, END, RESET, SAMPLES, DROP, MODE = range(12)
+
+# ── Tramas binarias ──────────────────────────────────────────────────────
+# A5 5A | seq (u8) | FRAME_SAMPLES cuentas ADC u16 LE | checksum (u8)
+# checksum = suma de seq y de los bytes de las cuentas, módulo 256. La
+# última trama de una corrida se rellena con PAD (no es una cuenta válida).
+SYNC = b'\xa5\x5a'
+FRAME_SAMPLES = 8
+FRAME_LEN = 3 + 2*FRAME_SAMPLES + 1
+PAD = 0xFFFF
+ADC_TO_VOLT = 5.0/1023.0
+
+_NUM = rb'([-+]?(?:\d+\.?\d*|\.\d+))'
+_RE_REF    = re.compile(rb'-->\s*referencia recibida:\s*' + _NUM, re.I)
+_RE_FLOW   = re.compile(rb'promedio flujo\s*=\s*' + _NUM, re.I)
+_RE_SIGMA  = re.compile(rb'precisi\S*\s*(?:\(.*?\))?\s*=\s*' + _NUM, re.I)
+_RE_EXACT  = re.compile(rb'exactitud\s*(?:\(.*?\))?\s*=\s*' + _NUM, re.I)
+_RE_OFFSET = re.compile(rb'offset calculado\s*=\s*' + _NUM, re.I)
+_RE_MODE   = re.compile(rb'modo (?:binario|texto):\s*(\d+) baud', re.I)
+
+_SAMPLE_START = frozenset(b'0123456789+-.')
+
+
+# Parser incremental de lo que imprime nuevo_codiog.ino. Recibe trozos de
+# bytes crudos y devuelve eventos; las muestras de la corrida en curso van
+# directo a un array('f') preasignado y salen completas en el END. Acepta
+# texto y tramas binarias mezcladas: una trama solo puede empezar donde
+# empezaría una línea, y A5 nunca abre una línea de texto del sketch.
+class ProtocolParser:
+    def __init__(self, capacity=128):
+        self._pending = b''
+        self._samples = array('f', bytes(4*capacity))
+        self._n = 0
+        self._last_seq = None
+        self.unparsed = 0   # líneas que parecían número pero no lo eran
+        self.dropped = 0    # tramas perdidas o con checksum malo
+
+    def reset(self):
+        self._pending = b''
+        self._n = 0
+        self._last_seq = None
+
+    def feed(self, chunk):
+        data = self._pending + chunk if self._pending else chunk
+        if 0xa5 in data:
+            return self._feed_mixed(data)
+        cut = data.rfind(b'\n')
+        if cut < 0:
+            self._pending = bytes(data)
+            return []
+        self._pending = bytes(data[cut+1:])
+        out = []
+        parse = self.parse_line
+        for raw in data[:cut].split(b'\n'):
+            parse(raw.rstrip(b'\r'), out)
+        return out
+
+    def _feed_mixed(self, data):
+        out = []
+        pos, end = 0, len(data)
+        while pos < end:
+            if data[pos] == 0xa5:
+                if end - pos < 2:
+                    break
+                if data.startswith(SYNC, pos):
+                    new = self._decode_frames(data, pos, out)
+                    if new == pos:
+                        break   # trama incompleta: esperar más bytes
+                    pos = new
+                    continue
+            nl = data.find(b'\n', pos)
+            sync = data.find(SYNC, pos)
+            if 0 <= sync < nl or (nl < 0 and sync >= 0):
+                # basura antes de la próxima trama: resincronizar
+                self.unparsed += 1
+                pos = sync
+                continue
+            if nl < 0:
+                break
+            self.parse_line(data[pos:nl].rstrip(b'\r'), out)
+            pos = nl + 1
+        self._pending = bytes(data[pos:])
+        return out
+
+    def _decode_frames(self, data, pos, out):
+        # decodifica de una vez todas las tramas contiguas desde pos
+        k = (len(data) - pos)//FRAME_LEN
+        if k == 0:
+            return pos
+        raw = np.frombuffer(data, np.uint8, count=k*FRAME_LEN, offset=pos).reshape(k, FRAME_LEN)
+        synced = (raw[:, 0] == 0xa5) & (raw[:, 1] == 0x5a)
+        if not synced.all():
+            k = int(np.argmin(synced))
+            raw = raw[:k]
+        good = (raw[:, 2:-1].sum(axis=1, dtype=np.uint32) & 0xff) == raw[:, -1]
+        raw = raw[good]
+        # huecos de secuencia entre tramas buenas (incluye las de checksum malo)
+        seq = raw[:, 2].astype(np.int32)
+        if self._last_seq is not None and len(seq):
+            seq = np.concatenate([[self._last_seq], seq])
+        lost = int(((np.diff(seq) - 1) % 256).sum()) if len(seq) > 1 else 0
+        if len(seq):
+            self._last_seq = int(seq[-1])
+        counts = np.ascontiguousarray(raw[:, 3:-1]).view('<u2').ravel()
+        counts = counts[counts <= 1023]
+        if len(counts):
+            volts = counts*ADC_TO_VOLT
+            self._append_many(volts)
+            out.append((SAMPLES, volts, None))
+        if lost:
+            self.dropped += lost
+            out.append((DROP, lost, b'[binario] %d tramas perdidas' % lost))
+        return pos + k*FRAME_LEN
+
+    def parse_line(self, line, out):
+        if not line:
+            out.append((TEXT, None, line)); return
+        c = line[0]
+        if c in _SAMPLE_START and not line.startswith(b'-->'):
+            try:
+                v = float(line)
+            except ValueError:
+                self.unparsed += 1
+            else:
+                self._append(v)
+                out.append((SAMPLE, v, line)); return
+        elif c in b'pP':
+            m = _RE_FLOW.match(line)
+            if m:
+                out.append((FLOW, float(m.group(1)), line)); return
+            m = _RE_SIGMA.match(line)
+            if m:
+                out.append((SIGMA, float(m.group(1)), line)); return
+        elif c in b'eE':
+            m = _RE_EXACT.match(line)
+            if m:
+                out.append((EXACT, float(m.group(1)), line))
+                out.append((END, self.take_samples(), None)); return
+        elif c in b'oO':
+            m = _RE_OFFSET.match(line)
+            if m:
+                out.append((OFFSET, float(m.group(1)), line))
+                out.append((END, self.take_samples(), None)); return
+        elif c in b'mM':
+            m = _RE_MODE.match(line)
+            if m:
+                self._last_seq = None
+                out.append((MODE, int(m.group(1)), line)); return
+        elif c == 0x2d:   # '-->' eco de la referencia: arranca corrida nueva
+            m = _RE_REF.match(line)
+            if m:
+                self._n = 0
+                out.append((REF, float(m.group(1)), line)); return
+        out.append((TEXT, None, line))
+
+    def _append(self, v):
+        buf, n = self._samples, self._n
+        if n == len(buf):
+            buf.extend(buf)   # duplica capacidad
+        buf[n] = v
+        self._n = n + 1
+
+    def _append_many(self, values):
+        n, k = self._n, len(values)
+        buf = self._samples
+        if n + k > len(buf):
+            buf.extend(array('f', bytes(4*max(n + k - len(buf), len(buf)))))
+        np.frombuffer(buf, dtype=np.float32)[n:n+k] = values
+        self._n = n + k
+
+    def take_samples(self):
+        # copia en float64 de las muestras acumuladas y vacía el buffer
+        n, self._n = self._n, 0
+        return np.frombuffer(self._samples, dtype=np.float32, count=n).astype(np.float64)
+
+
+# Junta los eventos de una corrida (eco de referencia, flujo, σ, offset) y
+# devuelve el dict completo al llegar el END; lo usan la app y el modo lote.
+class RunAssembler:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.ref = self.flowAvg = self.prec = self.offset = None
+
+    def push(self, kind, val):
+        if kind == REF:
+            self.reset(); self.ref = val
+        elif kind == FLOW:
+            self.flowAvg = val
+        elif kind == SIGMA:
+            self.prec = val
+        elif kind == OFFSET:
+            self.offset = val
+        elif kind == END:
+            run = {'ref': self.ref, 'flowAvg': self.flowAvg, 'prec': self.prec,
+                   'offset': self.offset, 'meas': val}
+            self.reset()
+            return run
+        return None
@@ -0,0 +1,234 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from instrumentacion import timed
+
+# Exportes de una sesión sin depender de Tk (los usan la app y procesar_lote).
+
+
+def export_txt(path, experiments):
+    with open(path,"w") as f:
+        for i,e in enumerate(experiments,1):
+            f.write(f"=== Exp {i} ===\n")
+            f.write(f"Referencia:        {e['ref']:.2f} slm\n")
+            f.write(f"FlowAvg:           {e['flowAvg']:.2f} slm\n")
+            f.write(f"VoltAvg:           {e['voltAvg']:.3f} V\n")
+            f.write(f"σ:                  {e['prec']:.3f} V\n")
+            f.write(f"Exactitud:         {e['exact']:.1f} %\n")
+            if e.get('offset') is not None:
+                f.write(f"Offset:            {e['offset']:.4f} V\n")
+            f.write(f"N datos:           {len(e['meas'])}\nMediciones:\n")
+            for j in range(0,len(e['meas']),10):
+                chunk=e['meas'][j:j+10]
+                f.write("  "+", ".join(f"{v:.3f}" for v in chunk)+"\n")
+            f.write("\n")
+
+
+class ReportCancelled(Exception):
+    pass
+
+
+@timed("reporte.snapshot")
+def snapshot(session, fit, fit_label="ordinario"):
+    # copia inmutable de lo que necesita el reporte: el hilo que arma el PDF
+    # no vuelve a tocar la sesión, que sigue cambiando en la UI
+    st = session.experiments
+    refs, volts = session.fit_points()
+    samples, lengths = st.packed()
+    snap = {c: np.array(st.column(c)) for c in ('ref', 'flowAvg', 'voltAvg', 'prec',
+                                                 'exact', 'std', 'worst')}
+    snap.update(offsets=np.array(st.column('offset')), refs=np.array(refs), volts=np.array(volts),
+                samples=np.array(samples), lengths=np.array(lengths))
+    for a in snap.values():
+        a.flags.writeable = False
+    snap.update(offset=session.offset, fit=tuple(float(v) for v in fit), fit_label=fit_label)
+    return snap
+
+
+# ── Gráficas cacheadas ────────────────────────────────────────────────────
+# PNG por hash de los datos: si no cambió nada desde el último reporte no se
+# vuelve a renderizar. API orientada a objetos de Agg, sin estado de pyplot.
+_PNG_CACHE = OrderedDict()
+_PNG_CACHE_MAX = 16
+_png_lock = threading.Lock()
+
+
+@timed("reporte.png")
+def _render_png(name, draw, *data):
+    h = hashlib.blake2b(name.encode(), digest_size=16)
+    for a in data:
+        h.update(np.ascontiguousarray(a, dtype=float).tobytes())
+    key = h.digest()
+    with _png_lock:
+        png = _PNG_CACHE.get(key)
+        if png is not None:
+            _PNG_CACHE.move_to_end(key)
+            return png
+    fig = Figure(figsize=(4,3))
+    FigureCanvasAgg(fig)
+    draw(fig.add_subplot())
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png')
+    png = buf.getvalue()
+    with _png_lock:
+        _PNG_CACHE[key] = png
+        while len(_PNG_CACHE) > _PNG_CACHE_MAX:
+            _PNG_CACHE.popitem(last=False)
+    return png
+
+
+def _draw_calibration(refs, volts, m, b):
+    def draw(ax):
+        ax.scatter(refs, volts, zorder=3)
+        xs = np.linspace(refs.min(), refs.max(), 100)
+        ax.plot(xs, m*xs + b, zorder=2)
+        ax.set_xlabel("Flujo de referencia (slm)")
+        ax.set_ylabel("Voltaje (V)")
+        ax.set_title("Calibración global")
+    return draw
+
+
+def _draw_worst(worst_pct):
+    def draw(ax):
+        ax.bar(np.arange(1, len(worst_pct)+1), worst_pct, edgecolor='k')
+        ax.set_xlabel("Experimento")
+        ax.set_ylabel("Máx desviación (%)")
+        ax.set_title("Peor desviación relativa")
+    return draw
+
+
+@timed("reporte.pdf")
+def build_pdf(path, snap, progress=None, cancel=None):
+    # progress(frac) en [0, 1]; cancel es un threading.Event. Si se cancela
+    # se lanza ReportCancelled antes de escribir nada en disco. reportlab
+    # recién se importa acá: ni la app ni export_txt lo necesitan al arrancar.
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas as pdfcanvas
+    from reportlab.lib.units import cm
+    from reportlab.lib.utils import ImageReader
+
+    refs, volts = snap['refs'], snap['volts']
+    offset, fit_label = snap['offset'], snap['fit_label']
+    m, b, r2 = snap['fit']
+    n_exp = len(snap['ref'])
+
+    def check(frac):
+        if cancel is not None and cancel.is_set():
+            raise ReportCancelled()
+        if progress is not None:
+            progress(frac)
+
+    # ── Cálculos previos (columnas cacheadas del almacén) ─────────────────
+    worst_exact = float(snap['exact'].max(initial=0.0))
+    worst_sigma = float(snap['std'].max(initial=0.0))
+    worst_pct = snap['worst']
+
+    # ── Preparar PDF ────────────────────────────────────────────────────
+    c = pdfcanvas.Canvas(path, pagesize=letter)
+    w, h = letter
+
+    # Título
+    c.setFont("Helvetica-Bold", 16)
+    c.drawString(2*cm, h-2*cm, "Reporte de Calibración de Flujómetro")
+
+    # Empezamos a escribir desde aquí hacia abajo
+    y = h - 2.7*cm
+    c.setFont("Helvetica", 12)
+
+    # Offset (si existe)
+    if offset is not None:
+        c.drawString(2*cm, y, f"Offset calculado: {offset:.4f} V")
+        y -= 0.6*cm
+
+    # Peores métricas al inicio
+    c.drawString(2*cm, y, f"Peor exactitud:     {worst_exact:.1f} %")
+    y -= 0.6*cm
+    c.drawString(2*cm, y, f"Mayor σ (desv. est.): {worst_sigma:.3f} V")
+    y -= 0.8*cm
+
+    # Ecuación global
+    c.drawString(2*cm, y, f"Linealización global ({fit_label}): y = {m:.3f} x + {b:.3f}, R² = {r2:.3f}")
+
+    # ── Detalles por experimento ───────────────────────────────────────
+    def new_text(y):
+        t = c.beginText(2*cm, y)
+        t.setFont("Helvetica", 10)
+        t.setLeading(12)
+        return t
+
+    text = new_text(y - 1*cm)
+    ends = np.cumsum(snap['lengths'])
+    for i in range(n_exp):
+        check(0.8*i/max(n_exp, 1))
+        meas = snap['samples'][ends[i]-snap['lengths'][i]:ends[i]]
+        rel_prec = snap['prec'][i] / snap['voltAvg'][i] * 100
+        lines = [f"Experimento {i+1}: Ref={snap['ref'][i]:.2f} slm, "
+                 f"FlowAvg={snap['flowAvg'][i]:.2f} slm, VoltAvg={snap['voltAvg'][i]:.3f} V, "
+                 f"σ={snap['prec'][i]:.3f} V ({rel_prec:.1f}%), Exactitud={snap['exact'][i]:.1f}%, "
+                 f"N={len(meas)}"]
+        if not np.isnan(snap['offsets'][i]):
+            lines.append(f"  Offset: {snap['offsets'][i]:.4f} V")
+        lines.append("  Mediciones crudas:")
+        vals = [f"{v:.3f}" for v in meas.tolist()]
+        lines.extend("    " + ", ".join(vals[j:j+10]) for j in range(0, len(vals), 10))
+        lines.append("")
+        for line in lines:
+            text.textLine(line)
+            if text.getY() < 2*cm:   # corte de página también dentro de una corrida larga
+                c.drawText(text)
+                c.showPage()
+                text = new_text(h-2*cm)
+    c.drawText(text)
+
+    # ── Página de gráficas ─────────────────────────────────────────────
+    check(0.8)
+    c.showPage()
+
+    # 1) Gráfica de linealización
+    png = _render_png("calibracion", _draw_calibration(refs, volts, m, b), refs, volts, [m, b])
+    c.drawImage(ImageReader(io.BytesIO(png)), 2*cm, h/2, w-4*cm, h/2-3*cm)
+
+    # 2) Gráfica de peor desviación relativa
+    check(0.9)
+    png = _render_png("peor", _draw_worst(worst_pct), worst_pct)
+    c.drawImage(ImageReader(io.BytesIO(png)), 2*cm, 2*cm, w-4*cm, h/2-5*cm)
+
+    # Límite máximo absoluto del sensor
+    overall = float(worst_pct.max(initial=0.0))
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(2*cm, 1.5*cm,
+                 f"Límite máximo absoluto del sensor: {overall:.1f}%")
+
+    check(1.0)
+    c.save()
+
+
+# Hilo que arma el PDF fuera del loop de Tk. La UI lee progress/done/error
+# con after() y pide cancelar con cancel().
+class ReportJob(threading.Thread):
+    def __init__(self, path, snap):
+        super().__init__(daemon=True)
+        self.path, self.snap = path, snap
+        self.progress = 0.0
+        self.error = None
+        self.cancelled = False
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def run(self):
+        def set_progress(frac):
+            self.progress = frac
+        try:
+            build_pdf(self.path, self.snap, set_progress, self._cancel)
+        except ReportCancelled:
+            self.cancelled = True
+        except Exception as e:
+            self.error = e
@@ -0,0 +1,128 @@
+import json
+import struct
+
+import numpy as np
+
+from almacen import COLUMNS, ExperimentStore
+from calibracion import CalibrationModel, robust_fit, sigma_weight
+
+
+# Estado de una sesión de calibración sin nada de Tk: experimentos, offset y
+# modelo de ajuste. La usan la app y el procesado por lotes.
+class CalibrationSession:
+    def __init__(self):
+        self.experiments = ExperimentStore()
+        self.calib = CalibrationModel()
+        self.offset = None
+        self._offset_point = None   # (x, y, σ, n) del offset dentro de self.calib
+
+    def add_run(self, run):
+        # run como lo arma RunAssembler; devuelve el índice del experimento,
+        # o None si era la corrida de offset (ref = 0)
+        ref, meas = run['ref'], run['meas']
+        flowAvg, prec, offset = run['flowAvg'], run['prec'], run['offset']
+        if offset is not None:
+            self.set_offset(offset, float(meas.std(ddof=1)) if len(meas) > 1 else None, len(meas))
+            return None
+        if ref is None or flowAvg is None or prec is None or not len(meas):
+            raise ValueError(f"Faltan datos: flowAvg={flowAvg}, prec={prec}, N={len(meas)}")
+        exact_pct = abs(ref-flowAvg)/ref*100 if ref!=0 else 0.0
+        idx = self.experiments.append(ref, flowAvg, prec, exact_pct, meas, offset)
+        self.calib.add(ref, self.experiments.column('voltAvg')[idx], prec, len(meas))
+        return idx
+
+    def delete(self, idx):
+        e = self.experiments[idx]
+        self.calib.remove(e['ref'], e['voltAvg'], e['prec'], len(e['meas']))
+        self.experiments.delete(idx)
+
+    def clear_runs(self):
+        # el offset se conserva: vuelve a ser el único punto del ajuste
+        self.experiments.clear()
+        self.calib.reset()
+        if self._offset_point: self.calib.add(*self._offset_point)
+
+    def set_offset(self, offset, sigma=None, n=1):
+        if self._offset_point: self.calib.remove(*self._offset_point)
+        self.offset = offset
+        self._offset_point = (0.0, offset, sigma, n)
+        self.calib.add(*self._offset_point)
+
+    def fit_points(self):
+        # refs y volts del ajuste, con el offset como punto (0, offset)
+        refs = self.experiments.column('ref')
+        volts = self.experiments.column('voltAvg')
+        if self.offset is not None:
+            refs = np.append(refs, 0.0)
+            volts = np.append(volts, self.offset)
+        return refs, volts
+
+    def fit(self, mode='ols'):
+        # (m, b, R²); None si aún no hay recta
+        if mode != 'robust':
+            return self.calib.fit(mode)
+        st = self.experiments
+        x, y = self.fit_points()
+        w = np.array([sigma_weight(p, n) for p, n in zip(st.column('prec'), st.lengths())])
+        if self._offset_point:
+            w = np.append(w, sigma_weight(*self._offset_point[2:]))
+        return robust_fit(x, y, w/w.mean() if len(w) else w)[0]
+
+
+# ── Persistencia ──────────────────────────────────────────────────────────
+# Archivo .cal: MAGIC (8 B) + largo del encabezado (uint64 LE) + encabezado
+# JSON + relleno hasta múltiplo de 16 + muestras float32 LE contiguas, que se
+# abren con np.memmap sin leerlas a memoria.
+MAGIC = b"FCAL\x01\x00\x00\x00"
+SAMPLE_DTYPE = np.dtype('<f4')
+
+
+def save_session(path, session, selected=()):
+    st = session.experiments
+    samples, lengths = st.packed()
+    cols = {}
+    for c in COLUMNS:
+        col = st.column(c)
+        cols[c] = [None if np.isnan(v) else float(v) for v in col] if c == 'offset' else col.tolist()
+    op = session._offset_point
+    header = json.dumps({
+        'version': 1,
+        'offset': session.offset,
+        'offset_sigma': op[2] if op else None,
+        'offset_n': op[3] if op else None,
+        'selected': [int(i) for i in selected],
+        'lengths': lengths.tolist(),
+        'columns': cols,
+    }).encode()
+    pad = -(len(MAGIC)+8+len(header)) % 16
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header)+pad))
+        f.write(header + b" "*pad)
+        samples.astype(SAMPLE_DTYPE).tofile(f)
+
+
+def read_session(path):
+    # (encabezado, muestras como memmap de solo lectura)
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} no es un archivo de sesión")
+        (hlen,) = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(hlen))
+    offset = len(MAGIC)+8+hlen
+    n = int(sum(header['lengths']))
+    if n == 0:
+        return header, np.empty(0, dtype=SAMPLE_DTYPE)
+    return header, np.memmap(path, dtype=SAMPLE_DTYPE, mode='r', offset=offset, shape=(n,))
+
+
+def load_session(path, session):
+    # agrega la sesión del archivo a la actual; devuelve la selección
+    # guardada ya desplazada a los índices nuevos
+    header, samples = read_session(path)
+    cols = {c: np.array(header['columns'][c], dtype=float) for c in COLUMNS}
+    added = session.experiments.extend(cols, header['lengths'], samples)
+    session.calib.add_many(cols['ref'], cols['voltAvg'], cols['prec'], header['lengths'])
+    if session.offset is None and header['offset'] is not None:
+        session.set_offset(header['offset'], header['offset_sigma'], header['offset_n'] or 1)
+    return [added[i] for i in header['selected'] if i < len(added)]